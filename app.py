@@ -2,10 +2,17 @@
 import logging
 import sys
 import streamlit as st
-from anthropic import Anthropic
 
-from src.config import APP_TITLE, CHAT_PLACEHOLDER, calculate_cost
+from assets.catalog import get_catalog
+from src.config import APP_TITLE, CHAT_PLACEHOLDER, CHAT_HISTORY_WINDOW, calculate_cost
 from src.chat_handler import ChatHandler
+from src.event_loop import get_background_loop
+from src.mcp_pool import get_mcp_pool
+from src.rate_limiter import get_rate_limiter
+from src.response_cache import get_response_cache
+from src.session_store import get_session_store
+from src.tool_cache import get_tool_cache
+from src.tracing import get_trace_recorder
 
 # Page config
 st.set_page_config(page_title="Gala Deck Chat", page_icon="🔮")
@@ -24,69 +31,147 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 logger.info("🚀 App starting")
 
-# Initialize Anthropic client
-if "anthropic_client" not in st.session_state:
-    api_key = st.secrets.get("ANTHROPIC_API_KEY")
-    if not api_key:
-        st.error("Please add ANTHROPIC_API_KEY to .streamlit/secrets.toml")
-        st.stop()
-    st.session_state.anthropic_client = Anthropic(api_key=api_key)
-
-# Initialize chat handler
-if "chat_handler" not in st.session_state:
-    st.session_state.chat_handler = ChatHandler(
-        st.session_state.anthropic_client)
-
-# Initialize chat history
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-
-# Initialize session totals
-if "total_usage" not in st.session_state:
-    st.session_state.total_usage = {
-        "input_tokens": 0,
-        "output_tokens": 0,
-        "total_cost": 0.0,
-        "request_count": 0,
-    }
+
+# Process-wide resources: created once per server process and shared by every
+# session and rerun, instead of being rebuilt in each st.session_state
+@st.cache_resource
+def get_anthropic_client(api_key):
+    from anthropic import AsyncAnthropic
+    return AsyncAnthropic(
+        api_key=api_key, max_retries=0)  # retries are scheduled by src.rate_limiter
+
+
+@st.cache_resource
+def get_shared_mcp_pool():
+    pool = get_mcp_pool()
+    # Start MCP workers in the background so the first question doesn't pay the spawn
+    get_background_loop().submit(pool.warm()).add_done_callback(log_warm_up_failure)
+    return pool
+
+
+def log_warm_up_failure(future):
+    if not future.cancelled() and future.exception():
+        logger.warning(f"⚠️ MCP warm-up failed: {future.exception()}")
+
+
+@st.cache_resource
+def get_card_catalog():
+    return get_catalog()
+
+
+api_key = st.secrets.get("ANTHROPIC_API_KEY")
+if not api_key:
+    st.error("Please add ANTHROPIC_API_KEY to .streamlit/secrets.toml")
+    st.stop()
+
+# Chat history and usage totals live in the session store, keyed by the
+# ?session= URL parameter, so a reconnect to any replica picks them up
+if "session_id" not in st.session_state:
+    session = get_session_store().open(st.query_params.get("session"), refresh=True)
+    st.query_params["session"] = session.session_id
+    st.session_state.session_id = session.session_id
+else:
+    session = get_session_store().open(st.session_state.session_id)
+
+# MCP workers start in the background while the page renders
+get_shared_mcp_pool()
+
+
+def get_chat_handler():
+    """The session's chat handler (it holds the routing budget), created on first use.
+
+    Deferred so the first page render doesn't wait for the Anthropic SDK.
+    """
+    if "chat_handler" not in st.session_state:
+        get_card_catalog()
+        handler = ChatHandler(get_anthropic_client(api_key), get_shared_mcp_pool())
+        handler.session_cost = session.total_usage["total_cost"]
+        st.session_state.chat_handler = handler
+    return st.session_state.chat_handler
 
 
 def display_chat_history():
-    for message in st.session_state.messages:
+    # Tool exchanges stay in the history for Claude but are not shown
+    visible = [message for message in session.messages
+               if isinstance(message["content"], str)]
+    # Only the latest messages are rendered on each rerun unless asked for
+    hidden = len(visible) - CHAT_HISTORY_WINDOW
+    if hidden > 0 and not st.session_state.get("show_full_history"):
+        if st.button(f"Show {hidden} earlier messages"):
+            st.session_state.show_full_history = True
+            st.rerun()
+        visible = visible[-CHAT_HISTORY_WINDOW:]
+    for message in visible:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
 
 def process_user_input(prompt):
     # Add user message
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    session.messages.append({"role": "user", "content": prompt})
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    # Get assistant response
+    # Stream assistant response
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            response, usage = st.session_state.chat_handler.chat(
-                st.session_state.messages)
-            st.markdown(response)
+        tool_status = st.empty()
 
-            # Update usage stats
-            update_usage_stats(usage)
+        def show_tool_status(event):
+            if event["type"] == "tool_use":
+                tool_status.caption(f"🔧 Calling `{event['name']}`...")
+            else:
+                tool_status.empty()
+
+        stream = get_chat_handler().chat_stream(
+            session.messages, on_tool=show_tool_status)
+        st.write_stream(stream)
+        tool_status.empty()
+        response = stream.text
+        if stream.usage.get("stop_cause"):
+            st.caption("⚠️ Answered early: the tool budget for this turn ran out "
+                       f"({stream.usage['stop_cause']}).")
+
+        # Update usage stats
+        update_usage_stats(stream.usage)
+        if stream.usage.get("turn_id"):
+            st.session_state.last_turn_id = stream.usage["turn_id"]
 
     # Add assistant message
-    st.session_state.messages.append(
+    session.messages.append(
         {"role": "assistant", "content": response})
+    session.commit()
 
 
 def update_usage_stats(usage):
     if usage:
         cost = calculate_cost(usage)
-        st.session_state.total_usage["input_tokens"] += usage.get(
+        session.total_usage["input_tokens"] += usage.get(
             "input_tokens", 0)
-        st.session_state.total_usage["output_tokens"] += usage.get(
+        session.total_usage["output_tokens"] += usage.get(
             "output_tokens", 0)
-        st.session_state.total_usage["total_cost"] += cost
-        st.session_state.total_usage["request_count"] += 1
+        session.total_usage["cache_creation_input_tokens"] += usage.get(
+            "cache_creation_input_tokens", 0)
+        session.total_usage["cache_read_input_tokens"] += usage.get(
+            "cache_read_input_tokens", 0)
+        session.total_usage["total_cost"] += cost
+        session.total_usage["request_count"] += 1
+        if usage.get("stop_cause"):
+            session.total_usage["stopped_turns"] += 1
+        session.total_usage["tool_schema_tokens_saved"] += usage.get(
+            "tool_schema_tokens_saved", 0)
+        by_model = session.total_usage["by_model"]
+        for model, model_usage in usage.get("by_model", {}).items():
+            totals = by_model.setdefault(model, dict.fromkeys(model_usage, 0))
+            for key, value in model_usage.items():
+                totals[key] += value
+
+
+def cache_hit_rate(usage):
+    """Share of prompt tokens served from the prompt cache"""
+    cached = usage.get("cache_read_input_tokens", 0)
+    prompt_tokens = (usage.get("input_tokens", 0) + cached +
+                     usage.get("cache_creation_input_tokens", 0))
+    return cached / prompt_tokens if prompt_tokens else 0.0
 
 
 # Sidebar
@@ -98,27 +183,67 @@ with st.sidebar:
             test_messages = [
                 {"role": "user", "content": "List all available routes"}
             ]
-            result, _ = st.session_state.chat_handler.chat(
+            result, _ = get_chat_handler().chat(
                 test_messages)  # Note: unpack tuple
             st.write(result)
 
     # Session stats (OPTIONAL)
     st.divider()
     st.header("📊 Session Stats")
-    st.metric("Requests", st.session_state.total_usage["request_count"])
+    st.metric("Requests", session.total_usage["request_count"])
     st.metric("Total Tokens",
-              st.session_state.total_usage["input_tokens"] +
-              st.session_state.total_usage["output_tokens"])
+              session.total_usage["input_tokens"] +
+              session.total_usage["output_tokens"])
     st.metric("Total Cost",
-              f"${st.session_state.total_usage['total_cost']:.4f}")
+              f"${session.total_usage['total_cost']:.4f}")
+    st.metric("Cache Hit Rate", f"{cache_hit_rate(session.total_usage):.0%}")
+    st.metric("Turns Stopped Early", session.total_usage["stopped_turns"])
+    st.metric("Tool Schema Tokens Saved", session.total_usage["tool_schema_tokens_saved"])
+
+    if session.total_usage["by_model"]:
+        with st.expander("🧭 Models"):
+            st.table({
+                model: {
+                    "calls": model_usage["calls"],
+                    "avg latency": f"{model_usage['latency_ms'] / model_usage['calls']:.0f} ms",
+                    "cost": f"${calculate_cost(model_usage, model):.4f}",
+                }
+                for model, model_usage in session.total_usage["by_model"].items()
+            })
+
+    pool_stats = get_mcp_pool().stats()
+    st.caption(
+        f"MCP workers: {pool_stats['in_use']}/{pool_stats['max_size']} busy · "
+        f"queue depth: {pool_stats['queue_depth']} · "
+        f"avg wait: {pool_stats['avg_wait_ms']:.0f} ms")
+    tool_cache_stats = get_tool_cache().stats()
+    st.caption(
+        f"Tool cache: {tool_cache_stats['hit_rate']:.0%} hit rate "
+        f"({tool_cache_stats['hits']} hits / {tool_cache_stats['misses']} misses)")
+    response_cache_stats = get_response_cache().stats()
+    if response_cache_stats["enabled"]:
+        st.caption(
+            f"Response cache: {response_cache_stats['hit_rate']:.0%} hit rate "
+            f"({response_cache_stats['hits']} hits) · "
+            f"{response_cache_stats['latency_saved_ms'] / 1000:.1f} s saved")
+    limiter_stats = get_rate_limiter().stats()
+    st.caption(
+        f"Claude calls: {limiter_stats['in_flight']} in flight · "
+        f"{limiter_stats['queued']} queued · {limiter_stats['retries']} retries")
+
+    recorder = get_trace_recorder()
+    if recorder.recent:
+        with st.expander("⏱️ Latency"):
+            # The recorder is shared by every session in this process
+            last_turn = recorder.find(st.session_state.get("last_turn_id"))
+            if last_turn:
+                st.caption(f"Your last turn: {last_turn['duration_ms']:.0f} ms")
+                st.table({name: f"{ms:.0f} ms" for name, ms in last_turn["phases"].items()})
+            st.caption("Recent turns, all sessions on this server (ms)")
+            st.table(recorder.summary())
 
     if st.button("Reset Stats"):
-        st.session_state.total_usage = {
-            "input_tokens": 0,
-            "output_tokens": 0,
-            "total_cost": 0.0,
-            "request_count": 0,
-        }
+        session.reset_usage()
         st.rerun()
 
     if st.button("Test MCP Server"):
@@ -134,6 +259,8 @@ with st.sidebar:
         except Exception as e:
             st.error(f"MCP server test failed: {e}")
 
+display_chat_history()
+
 # Chat input
 if prompt := st.chat_input(CHAT_PLACEHOLDER):
     process_user_input(prompt)
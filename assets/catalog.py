@@ -0,0 +1,139 @@
+"""
+Immutable in-memory card catalog loaded from cards.json
+
+Card metadata never changes at runtime, so reads go through this catalog
+instead of the database:
+
+    from assets.catalog import get_catalog
+    catalog = get_catalog()
+    catalog.by_name("the fool").meaning_upright
+    catalog.with_keyword("grief")
+"""
+import json
+import os
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+CARDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cards.json")
+
+
+class CardRecord(NamedTuple):
+    """One card's metadata; field names match the Card model columns"""
+    id: int
+    name: str
+    arcana: str
+    number: int
+    suit: Optional[str]
+    element: str
+    keywords: Tuple[str, ...]
+    symbolism: Optional[str]
+    meaning_upright: Optional[str]
+    meaning_reversed: Optional[str]
+    prompt_template: str
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "CardRecord":
+        return cls(**{**{field: None for field in cls._fields},
+                      **{k: v for k, v in data.items() if k in cls._fields},
+                      "keywords": tuple(data.get("keywords") or ())})
+
+
+def _keyword_terms(keyword: str) -> List[str]:
+    """The whole keyword phrase plus its individual words, lowercased"""
+    phrase = keyword.strip().lower()
+    return [phrase] + [word for word in re.findall(r"[a-z0-9']+", phrase) if word != phrase]
+
+
+class CardCatalog:
+    """
+    Read-only card lookups, all precomputed at load time.
+
+    Every index maps to CardRecord tuples, so lookups are a single dict
+    access and return shared immutable objects.
+    """
+
+    def __init__(self, cards: List[CardRecord]):
+        self._cards: Tuple[CardRecord, ...] = tuple(sorted(cards, key=lambda card: card.id))
+        by_id: Dict[int, CardRecord] = {}
+        by_name: Dict[str, CardRecord] = {}
+        by_arcana_number: Dict[Tuple[str, int, Optional[str]], CardRecord] = {}
+        groups: Dict[str, Dict[str, List[CardRecord]]] = {"arcana": {}, "suit": {}, "element": {}}
+        keywords: Dict[str, List[CardRecord]] = {}
+
+        for card in self._cards:
+            if card.id in by_id:
+                raise ValueError(f"Duplicate card id {card.id}")
+            by_id[card.id] = card
+            by_name[card.name.lower()] = card
+            by_arcana_number[(card.arcana, card.number, card.suit)] = card
+            for field, index in groups.items():
+                value = getattr(card, field)
+                if value is not None:
+                    index.setdefault(value, []).append(card)
+            for keyword in card.keywords:
+                for term in _keyword_terms(keyword):
+                    matches = keywords.setdefault(term, [])
+                    if card not in matches:
+                        matches.append(card)
+
+        self._by_id = MappingProxyType(by_id)
+        self._by_name = MappingProxyType(by_name)
+        self._by_arcana_number = MappingProxyType(by_arcana_number)
+        self._by_arcana, self._by_suit, self._by_element = (
+            MappingProxyType({value: tuple(cards) for value, cards in groups[field].items()})
+            for field in ("arcana", "suit", "element"))
+        self._by_keyword = MappingProxyType({term: tuple(cards) for term, cards in keywords.items()})
+
+    @classmethod
+    def from_json(cls, path: str = CARDS_PATH) -> "CardCatalog":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls([CardRecord.from_dict(card) for card in data["cards"]])
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def __iter__(self) -> Iterator[CardRecord]:
+        return iter(self._cards)
+
+    @property
+    def cards(self) -> Tuple[CardRecord, ...]:
+        """All cards ordered by id"""
+        return self._cards
+
+    @property
+    def keywords(self) -> Mapping[str, Tuple[CardRecord, ...]]:
+        """Inverted index from keyword phrase or word to cards"""
+        return self._by_keyword
+
+    def get(self, card_id: int) -> Optional[CardRecord]:
+        return self._by_id.get(card_id)
+
+    def by_name(self, name: str) -> Optional[CardRecord]:
+        """Case-insensitive lookup by full card name"""
+        return self._by_name.get(name.strip().lower())
+
+    def by_arcana_number(self, arcana: str, number: int, suit: Optional[str] = None) -> Optional[CardRecord]:
+        """Major arcana by number, or a minor arcana card by number and suit"""
+        return self._by_arcana_number.get((arcana, number, suit))
+
+    def by_arcana(self, arcana: str) -> Tuple[CardRecord, ...]:
+        return self._by_arcana.get(arcana, ())
+
+    def by_suit(self, suit: str) -> Tuple[CardRecord, ...]:
+        return self._by_suit.get(suit, ())
+
+    def by_element(self, element: str) -> Tuple[CardRecord, ...]:
+        return self._by_element.get(element, ())
+
+    def with_keyword(self, keyword: str) -> Tuple[CardRecord, ...]:
+        """Cards whose keywords contain ``keyword`` as a phrase or a word"""
+        return self._by_keyword.get(keyword.strip().lower(), ())
+
+
+@lru_cache(maxsize=None)
+def get_catalog(path: str = CARDS_PATH) -> CardCatalog:
+    """Load the catalog once per process (per path)"""
+    return CardCatalog.from_json(path)
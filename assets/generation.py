@@ -0,0 +1,173 @@
+"""
+Render every card's prompt_template in N styles and run them through a generator
+
+Usage (from the assets directory):
+    python generation.py --style watercolor --style "art nouveau" --checkpoint gen.jsonl
+    python generation.py --style ukiyo-e --backend mypackage.images:ImageBackend --workers 8
+
+Each card's template is compiled once, then all 78 x N prompts are rendered
+in one pass. Jobs run on a bounded thread pool; each finished job is appended
+to the checkpoint file, so re-running the same command after a crash skips
+the work that is already done.
+"""
+import argparse
+import importlib
+import json
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Protocol, Set
+
+try:
+    from .catalog import CardCatalog, get_catalog
+except ImportError:  # run from inside assets/
+    from catalog import CardCatalog, get_catalog
+
+PLACEHOLDER = "{token}"
+
+
+class CompiledTemplate:
+    """
+    A prompt template split around its {token} placeholders.
+    Rendering is a single join, with no parsing or format-spec handling, so
+    other braces in the template are left alone.
+    """
+    __slots__ = ("parts",)
+
+    def __init__(self, template: str):
+        if PLACEHOLDER not in template:
+            raise ValueError(f"Template has no {PLACEHOLDER} placeholder: {template[:60]!r}")
+        self.parts = tuple(template.split(PLACEHOLDER))
+
+    def render(self, token: str) -> str:
+        return token.join(self.parts)
+
+
+class PromptJob(NamedTuple):
+    job_id: str
+    card_id: int
+    card_name: str
+    style: str
+    prompt: str
+
+
+class GeneratorBackend(Protocol):
+    """Anything that turns a prompt into an output; called from worker threads"""
+
+    def generate(self, job: PromptJob) -> Dict[str, Any]:
+        ...
+
+
+class StubBackend:
+    """Local stand-in backend for tests and dry runs"""
+
+    def __init__(self, delay: float = 0.0, fail_job_ids: Iterable[str] = ()):
+        self.delay = delay
+        self.fail_job_ids = set(fail_job_ids)
+        self.calls: List[str] = []
+
+    def generate(self, job: PromptJob) -> Dict[str, Any]:
+        self.calls.append(job.job_id)
+        if self.delay:
+            time.sleep(self.delay)
+        if job.job_id in self.fail_job_ids:
+            raise RuntimeError(f"stub failure for {job.job_id}")
+        return {"output": f"stub://{job.job_id}.png", "prompt_chars": len(job.prompt)}
+
+
+def style_slug(style: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", style.lower()).strip("-")
+
+
+def render_prompts(styles: List[str], catalog: Optional[CardCatalog] = None) -> List[PromptJob]:
+    """One job per card and style, ordered card by card"""
+    catalog = catalog or get_catalog()
+    slugs = [(style, style_slug(style)) for style in styles]
+    jobs = []
+    for card in catalog:
+        template = CompiledTemplate(card.prompt_template)
+        jobs.extend(PromptJob(f"{card.id}:{slug}", card.id, card.name, style, template.render(style))
+                    for style, slug in slugs)
+    return jobs
+
+
+def load_completed(checkpoint_path: str) -> Set[str]:
+    """Job ids already finished successfully in a checkpoint file"""
+    completed = set()
+    if not os.path.exists(checkpoint_path):
+        return completed
+    with open(checkpoint_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial line from a crash
+            if record.get("status") == "ok":
+                completed.add(record["job_id"])
+    return completed
+
+
+def load_backend(spec: str) -> GeneratorBackend:
+    """Instantiate a backend from ``module:ClassName``"""
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def run_generation(backend: GeneratorBackend, styles: List[str], checkpoint_path: str,
+                   workers: int = 4, catalog: Optional[CardCatalog] = None) -> Dict[str, Any]:
+    """
+    Run all pending jobs with at most ``workers`` in flight.
+    Only the calling thread writes the checkpoint; failed jobs are recorded
+    but retried on the next run.
+    """
+    jobs = render_prompts(styles, catalog)
+    completed = load_completed(checkpoint_path)
+    pending = [job for job in jobs if job.job_id not in completed]
+    totals = {"jobs": len(jobs), "skipped": len(completed & {job.job_id for job in jobs}),
+              "ok": 0, "error": 0}
+    started = time.perf_counter()
+
+    def record(future: Future, job: PromptJob, out):
+        result = {"job_id": job.job_id, "card_id": job.card_id, "card": job.card_name,
+                  "style": job.style}
+        try:
+            result.update(future.result())
+            result["status"] = "ok"
+        except Exception as e:
+            result.update(status="error", error=str(e))
+        totals[result["status"]] += 1
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+
+    with open(checkpoint_path, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="generation") as pool:
+        in_flight: Dict[Future, PromptJob] = {}
+        for job in pending:
+            if len(in_flight) >= workers:  # never queue more than the pool can run
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(future, in_flight.pop(future), out)
+            in_flight[pool.submit(backend.generate, job)] = job
+        for future in wait(in_flight).done:
+            record(future, in_flight[future], out)
+
+    totals["elapsed_s"] = round(time.perf_counter() - started, 3)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate card images for each style")
+    parser.add_argument("--style", action="append", required=True, help="style token (repeatable)")
+    parser.add_argument("--checkpoint", required=True, help="JSONL results file (appended; resumable)")
+    parser.add_argument("--workers", type=int, default=4, help="jobs in flight at once")
+    parser.add_argument("--backend", help="generator class as module:ClassName (default: stub)")
+    args = parser.parse_args()
+
+    backend = load_backend(args.backend) if args.backend else StubBackend()
+    totals = run_generation(backend, args.style, args.checkpoint, args.workers)
+    print(json.dumps(totals, indent=2))
+
+
+if __name__ == "__main__":
+    main()
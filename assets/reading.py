@@ -0,0 +1,160 @@
+"""
+Seeded tarot spread drawing over the 78-card deck
+
+Single readings:
+    engine = ReadingEngine()
+    reading = engine.draw("celtic_cross", seed=42)
+    for drawn in reading.cards:
+        print(drawn.position, drawn.card.name, drawn.meaning)
+
+Simulations (requires numpy, ``pip install gala-deck[bulk]``):
+    ids, reversed_ = engine.bulk_draw(1_000_000, "three_card", seed=7)
+    counts = engine.card_counts(ids)
+
+The deck is a compact array of card ids; cards are only looked up when a
+reading is returned. The same seed always gives the same reading.
+"""
+import random
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+try:
+    from .catalog import CardCatalog, CardRecord, get_catalog
+except ImportError:  # run from inside assets/
+    from catalog import CardCatalog, CardRecord, get_catalog
+
+DEFAULT_REVERSAL_PROBABILITY = 0.5
+BULK_CHUNK_ROWS = 65_536  # rows of random keys generated at once (~40 MB of float64)
+
+
+class Spread(NamedTuple):
+    """Named layout; one card is drawn per position, in order"""
+    name: str
+    positions: Tuple[str, ...]
+
+
+SPREADS: Dict[str, Spread] = {
+    spread.name: spread for spread in (
+        Spread("single", ("Card",)),
+        Spread("three_card", ("Past", "Present", "Future")),
+        Spread("celtic_cross", (
+            "Present", "Challenge", "Foundation", "Recent Past", "Crown", "Near Future",
+            "Self", "Environment", "Hopes and Fears", "Outcome",
+        )),
+    )
+}
+
+
+class DrawnCard(NamedTuple):
+    position: str
+    card: CardRecord
+    reversed: bool
+
+    @property
+    def meaning(self) -> Optional[str]:
+        return self.card.meaning_reversed if self.reversed else self.card.meaning_upright
+
+
+class Reading(NamedTuple):
+    spread: str
+    seed: int
+    reversal_probability: float
+    cards: Tuple[DrawnCard, ...]
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError("Bulk drawing needs numpy: pip install 'gala-deck[bulk]'") from e
+    return numpy
+
+
+class ReadingEngine:
+    """
+    Draws spreads from the catalog's deck.
+    The deck is never mutated, so one engine can serve concurrent requests.
+    """
+
+    def __init__(self, catalog: Optional[CardCatalog] = None,
+                 reversal_probability: float = DEFAULT_REVERSAL_PROBABILITY):
+        self.catalog = catalog or get_catalog()
+        self.reversal_probability = reversal_probability
+        self._cards: Tuple[CardRecord, ...] = self.catalog.cards
+        self.deck = array("H", (card.id for card in self._cards))
+        self._by_position = {card.id: i for i, card in enumerate(self._cards)}
+
+    def __len__(self) -> int:
+        return len(self.deck)
+
+    @staticmethod
+    def spread(spread: Union[str, Spread]) -> Spread:
+        if isinstance(spread, Spread):
+            return spread
+        try:
+            return SPREADS[spread]
+        except KeyError:
+            raise ValueError(f"Unknown spread {spread!r}; choose from {', '.join(SPREADS)}") from None
+
+    def _probability(self, reversal_probability: Optional[float]) -> float:
+        p = self.reversal_probability if reversal_probability is None else reversal_probability
+        if not 0.0 <= p <= 1.0:
+            raise ValueError(f"reversal_probability must be between 0 and 1, got {p}")
+        return p
+
+    def draw_ids(self, count: int, seed: int,
+                 reversal_probability: Optional[float] = None) -> List[Tuple[int, bool]]:
+        """``count`` distinct ``(card_id, reversed)`` pairs; no card objects involved"""
+        if not 0 < count <= len(self.deck):
+            raise ValueError(f"Can draw between 1 and {len(self.deck)} cards, not {count}")
+        p = self._probability(reversal_probability)
+        rng = random.Random(seed)
+        return [(card_id, rng.random() < p) for card_id in rng.sample(self.deck, count)]
+
+    def draw(self, spread: Union[str, Spread] = "three_card", seed: Optional[int] = None,
+             reversal_probability: Optional[float] = None) -> Reading:
+        """Draw one reading; without a seed a random one is picked and recorded"""
+        layout = self.spread(spread)
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        p = self._probability(reversal_probability)
+        drawn = self.draw_ids(len(layout.positions), seed, p)
+        return Reading(layout.name, seed, p, tuple(
+            DrawnCard(position, self._cards[self._by_position[card_id]], is_reversed)
+            for position, (card_id, is_reversed) in zip(layout.positions, drawn)))
+
+    def bulk_draw(self, n: int, spread: Union[str, Spread, int] = "three_card",
+                  seed: Optional[int] = None, reversal_probability: Optional[float] = None):
+        """
+        ``n`` independent draws as numpy arrays ``(card_ids, reversed)``, both of
+        shape ``(n, cards_per_draw)``. Each row is a uniformly random ordered
+        sample without replacement, generated in chunks to bound memory.
+        """
+        np = _numpy()
+        count = spread if isinstance(spread, int) else len(self.spread(spread).positions)
+        if not 0 < count <= len(self.deck):
+            raise ValueError(f"Can draw between 1 and {len(self.deck)} cards, not {count}")
+        p = self._probability(reversal_probability)
+        rng = np.random.default_rng(seed)
+        dtype = np.uint8 if max(self.deck) < 256 else np.uint16
+        deck = np.frombuffer(self.deck, dtype=np.uint16).astype(dtype)
+        ids = np.empty((n, count), dtype=dtype)
+
+        for start in range(0, n, BULK_CHUNK_ROWS):
+            stop = min(n, start + BULK_CHUNK_ROWS)
+            keys = rng.random((stop - start, len(deck)))
+            # The `count` smallest random keys, ordered by key, form a random ordered sample
+            if count < len(deck):
+                picked = np.argpartition(keys, count - 1, axis=1)[:, :count]
+            else:
+                picked = np.broadcast_to(np.arange(len(deck)), keys.shape)
+            order = np.take_along_axis(keys, picked, axis=1).argsort(axis=1)
+            ids[start:stop] = deck[np.take_along_axis(picked, order, axis=1)]
+
+        reversed_ = rng.random((n, count)) < p
+        return ids, reversed_
+
+    def card_counts(self, ids):
+        """How often each card id appears in ``bulk_draw`` output (index = card id)"""
+        np = _numpy()
+        return np.bincount(ids.ravel(), minlength=max(self.deck) + 1)
@@ -0,0 +1,99 @@
+"""
+Ranked full-text search over card names, keywords, symbolism and meanings
+
+Postgres uses a GIN index on a tsvector expression; SQLite (local use and
+tests) uses an FTS5 table kept alongside the cards table. Build the index
+after seeding, then query it:
+
+    create_search_index(engine)
+    search_cards(engine, "which cards are about grief?")
+
+Free text is reduced to plain words that are OR-ed together, so a question
+can be passed straight through; results are ordered by relevance.
+"""
+import re
+from typing import List, NamedTuple
+
+from sqlalchemy import text
+
+STOPWORDS = {
+    "a", "about", "an", "and", "any", "are", "be", "card", "cards", "do", "does", "for",
+    "i", "in", "is", "it", "me", "mean", "of", "on", "or", "show", "tell", "that", "the",
+    "to", "what", "which", "with",
+}
+
+# Names and keywords (weight A) rank above the longer descriptions (weight B).
+# '||' rather than concat_ws keeps the expression IMMUTABLE, as GIN indexes require.
+PG_VECTOR = (
+    "setweight(to_tsvector('english'::regconfig, "
+    "coalesce(name, '') || ' ' || coalesce(keywords::text, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, "
+    "coalesce(symbolism, '') || ' ' || coalesce(meaning_upright, '') || ' ' || "
+    "coalesce(meaning_reversed, '')), 'B')"
+)
+PG_CREATE_INDEX = f"CREATE INDEX IF NOT EXISTS idx_cards_search ON cards USING GIN (({PG_VECTOR}))"
+PG_SEARCH = (
+    f"SELECT id, name, ts_rank({PG_VECTOR}, query) AS rank "
+    f"FROM cards, to_tsquery('english'::regconfig, :query) AS query "
+    f"WHERE ({PG_VECTOR}) @@ query ORDER BY rank DESC, id LIMIT :limit"
+)
+
+# External-content FTS5 table: the text lives only in cards, FTS5 stores the index
+SQLITE_CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5("
+    "name, keywords, symbolism, meaning_upright, meaning_reversed, "
+    "content='cards', content_rowid='id', tokenize='porter unicode61')"
+)
+SQLITE_REBUILD = "INSERT INTO cards_fts(cards_fts) VALUES ('rebuild')"
+# bm25() is lower-is-better; column weights follow the Postgres A/B split
+SQLITE_SEARCH = (
+    "SELECT cards.id, cards.name, -bm25(cards_fts, 4.0, 4.0, 1.0, 1.0, 1.0) AS rank "
+    "FROM cards_fts JOIN cards ON cards.id = cards_fts.rowid "
+    "WHERE cards_fts MATCH :query ORDER BY rank DESC, cards.id LIMIT :limit"
+)
+
+
+class SearchHit(NamedTuple):
+    """One ranked match; higher rank is more relevant"""
+    card_id: int
+    name: str
+    rank: float
+
+
+def query_terms(query: str) -> List[str]:
+    """Lowercased words of a free-text query, without stopwords or duplicates"""
+    words = re.findall(r"[a-z0-9]+", query.lower())
+    return list(dict.fromkeys(word for word in words if word not in STOPWORDS))
+
+
+def create_search_index(bind):
+    """
+    Create (or refresh) the full-text index for the cards table.
+    On SQLite this also rebuilds the FTS5 table, so call it again after seeding.
+    """
+    dialect = bind.dialect.name
+    with bind.begin() as connection:
+        if dialect == "postgresql":
+            connection.execute(text(PG_CREATE_INDEX))
+        elif dialect == "sqlite":
+            connection.execute(text(SQLITE_CREATE_INDEX))
+            connection.execute(text(SQLITE_REBUILD))
+        else:
+            raise NotImplementedError(f"Full-text search is not supported on {dialect}")
+
+
+def search_cards(bind, query: str, limit: int = 5) -> List[SearchHit]:
+    """Cards matching any word of ``query``, most relevant first"""
+    terms = query_terms(query)
+    if not terms:
+        return []
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        sql, match = PG_SEARCH, " | ".join(f"{term}:*" for term in terms)
+    elif dialect == "sqlite":
+        sql, match = SQLITE_SEARCH, " OR ".join(f'"{term}"*' for term in terms)
+    else:
+        raise NotImplementedError(f"Full-text search is not supported on {dialect}")
+    with bind.connect() as connection:
+        rows = connection.execute(text(sql), {"query": match, "limit": limit})
+        return [SearchHit(row.id, row.name, float(row.rank)) for row in rows]
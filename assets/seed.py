@@ -0,0 +1,127 @@
+"""
+Seed the cards table from cards.json
+
+Usage (from the assets directory):
+    python seed.py            # create tables, upsert all cards, refresh the search index
+    python seed.py --path other_cards.json
+
+All cards are written in one transaction with a single set-based upsert on
+the card id from cards.json, so a renamed card updates its existing row.
+Rows that already match are left untouched, so re-running the seed is a
+no-op. On Postgres the id sequence is moved past the seeded ids.
+"""
+import argparse
+import json
+import os
+from typing import Any, Dict, List
+
+from sqlalchemy import Text, cast, or_, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import Base, engine
+from models import ArcanaType, Card, ElementType, SuitType
+from search import create_search_index
+
+CARDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cards.json")
+
+DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+UPDATE_COLUMNS = ["name", "arcana", "number", "suit", "element", "keywords", "symbolism",
+                  "meaning_upright", "meaning_reversed", "prompt_template"]
+REQUIRED_FIELDS = ["id", "name", "arcana", "number", "element", "prompt_template"]
+
+
+def validate_card(card: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Check one cards.json entry and return it as a row for the cards table.
+    Raises ValueError describing every problem found.
+    """
+    label = card.get("name") or f"card #{card.get('id', '?')}"
+    errors = [f"missing {field}" for field in REQUIRED_FIELDS if card.get(field) in (None, "")]
+    row = {column: card.get(column) for column in ["id"] + UPDATE_COLUMNS}
+    if row["id"] is not None and (not isinstance(row["id"], int) or row["id"] < 0):
+        errors.append(f"invalid id {row['id']!r}")
+
+    for column, enum in (("arcana", ArcanaType), ("suit", SuitType), ("element", ElementType)):
+        value = card.get(column)
+        if value is None:
+            continue
+        try:
+            row[column] = enum(value)
+        except ValueError:
+            allowed = ", ".join(member.value for member in enum)
+            errors.append(f"invalid {column} {value!r} (expected one of: {allowed})")
+
+    if row["arcana"] == ArcanaType.MAJOR and row["suit"] is not None:
+        errors.append("major arcana cards have no suit")
+    if row["arcana"] == ArcanaType.MINOR and row["suit"] is None:
+        errors.append("minor arcana cards need a suit")
+    if errors:
+        raise ValueError(f"{label}: " + "; ".join(errors))
+    return row
+
+
+def load_cards(path: str = CARDS_PATH) -> List[Dict[str, Any]]:
+    """Read and validate every card; raises ValueError listing all invalid cards"""
+    with open(path, encoding="utf-8") as f:
+        cards = json.load(f)["cards"]
+    rows, errors = [], []
+    for card in cards:
+        try:
+            rows.append(validate_card(card))
+        except ValueError as e:
+            errors.append(str(e))
+    for field in ("id", "name"):
+        values = [row[field] for row in rows]
+        errors += [f"duplicate {field} {value!r}"
+                   for value in sorted({v for v in values if values.count(v) > 1})]
+    if errors:
+        raise ValueError("Invalid cards.json:\n" + "\n".join(errors))
+    return rows
+
+
+def seed_cards(bind=engine, path: str = CARDS_PATH) -> int:
+    """
+    Upsert all cards in a single transaction.
+    Returns the number of rows inserted or changed.
+    """
+    rows = load_cards(path)
+    insert = DIALECT_INSERTS.get(bind.dialect.name)
+    if insert is None:
+        raise NotImplementedError(f"Seeding is not supported on {bind.dialect.name}")
+
+    table = Card.__table__
+    stmt = insert(table).values(rows)
+    # JSON has no equality operator in Postgres, so compare every column as text
+    changed = or_(*(cast(table.c[column], Text).is_distinct_from(cast(stmt.excluded[column], Text))
+                    for column in UPDATE_COLUMNS))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={column: stmt.excluded[column] for column in UPDATE_COLUMNS},
+        where=changed,
+    )
+    with bind.begin() as connection:
+        result = connection.execute(stmt)
+        if bind.dialect.name == "postgresql":
+            # Explicit ids don't advance the serial; keep later inserts from colliding
+            connection.execute(text(
+                "SELECT setval(pg_get_serial_sequence('cards', 'id'), "
+                "COALESCE((SELECT MAX(id) FROM cards), 0) + 1, false)"))
+    return max(result.rowcount, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the cards table from cards.json")
+    parser.add_argument("--path", default=CARDS_PATH, help="cards JSON file")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    written = seed_cards(engine, args.path)
+    create_search_index(engine)
+    print(f"Seeded cards: {written} rows inserted or updated; search index refreshed")
+
+
+if __name__ == "__main__":
+    main()
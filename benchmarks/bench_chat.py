@@ -0,0 +1,153 @@
+"""End-to-end ChatHandler benchmark against a local MCP server and fake Claude.
+
+Usage:
+    python -m benchmarks.bench_chat --sessions 8 --turns 3 --output bench.json
+
+Runs fully offline: tools are served by ``fake_mcp_server.py`` over stdio
+and the Messages API is replaced by ``FakeAsyncAnthropic``. Results are a
+single JSON document so runs can be diffed between commits.
+"""
+import argparse
+import json
+from collections import Counter
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from src.chat_handler import ChatHandler
+from src.event_loop import BackgroundLoop
+from src.mcp_client import MCPClient
+from src.mcp_pool import MCPSessionPool
+from src.rate_limiter import RateLimiter
+from src.response_cache import ResponseCache
+from src.tool_cache import ToolResultCache
+from src.tracing import TraceRecorder, percentile
+
+from .fake_anthropic import FakeAsyncAnthropic
+
+FAKE_SERVER = str(Path(__file__).with_name("fake_mcp_server.py"))
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=Path(__file__).parent).stdout.strip()
+    except OSError:
+        return ""
+
+
+def _latency_summary(values):
+    return {
+        "count": len(values),
+        "mean": round(statistics.fmean(values), 2) if values else 0.0,
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+    }
+
+
+def run_benchmark(sessions: int = 4, turns: int = 3, tool_iterations: int = 2,
+                  parallel_tools: int = 2, tool_latency_ms: float = 20,
+                  payload_bytes: int = 2000, tool_count: int = 8, pool_size: int = 2,
+                  ttft_ms: float = 50, tool_cache: bool = False):
+    """Run ``sessions`` concurrent conversations of ``turns`` turns and return metrics"""
+    server_args = [FAKE_SERVER, "--tools", str(tool_count), "--latency-ms", str(tool_latency_ms),
+                   "--payload-bytes", str(payload_bytes)]
+    cache = ToolResultCache(path=None, default_ttl=3600 if tool_cache else 0)
+    background = BackgroundLoop("bench-loop")
+    pool = MCPSessionPool(
+        max_size=pool_size, min_size=pool_size, acquire_timeout=120,
+        client_factory=lambda: MCPClient(cache=cache, command=sys.executable, args=server_args),
+        background_loop=background)
+    recorder = TraceRecorder(path=None, history_size=sessions * turns)
+    client = FakeAsyncAnthropic(tool_iterations=tool_iterations, parallel_tools=parallel_tools,
+                                ttft_ms=ttft_ms)
+    # The fake API has no quota; the process-wide limiter would only measure throttling
+    limiter = RateLimiter(requests_per_minute=0, input_tokens_per_minute=0,
+                          max_in_flight=max(1, sessions))
+
+    started = time.perf_counter()
+    background.run(pool.warm())
+    cold_start_ms = (time.perf_counter() - started) * 1000
+
+    turn_latencies = []
+    errors = []
+    stopped = Counter()
+
+    def run_session(index):
+        handler = ChatHandler(client, pool, background_loop=background, recorder=recorder,
+                              limiter=limiter, response_cache=ResponseCache(path=None))
+        messages = []
+        for turn in range(turns):
+            messages.append({"role": "user", "content": f"session {index} question {turn}"})
+            turn_started = time.perf_counter()
+            text, usage = handler.chat(messages)
+            turn_latencies.append((time.perf_counter() - turn_started) * 1000)
+            if not usage:
+                errors.append(text)
+            elif usage.get("stop_cause"):
+                stopped[usage["stop_cause"]] += 1
+            messages.append({"role": "assistant", "content": text})
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        list(executor.map(run_session, range(sessions)))
+    wall_s = time.perf_counter() - started
+
+    pool_stats = pool.stats()
+    pool.close()
+    background.stop()
+
+    return {
+        "commit": _git_commit(),
+        "params": {
+            "sessions": sessions, "turns": turns, "tool_iterations": tool_iterations,
+            "parallel_tools": parallel_tools, "tool_latency_ms": tool_latency_ms,
+            "payload_bytes": payload_bytes, "tool_count": tool_count, "pool_size": pool_size,
+            "ttft_ms": ttft_ms, "tool_cache": tool_cache,
+        },
+        "cold_start_ms": round(cold_start_ms, 2),
+        "wall_s": round(wall_s, 3),
+        "throughput_turns_per_s": round(len(turn_latencies) / wall_s, 3) if wall_s else 0.0,
+        "turn_latency_ms": _latency_summary(turn_latencies),
+        "phases_ms": recorder.summary(),
+        "pool": pool_stats,
+        "tool_cache": cache.stats(),
+        "rate_limiter": limiter.stats(),
+        "stopped_turns": dict(stopped),
+        "errors": errors,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline ChatHandler benchmark")
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent chat sessions")
+    parser.add_argument("--turns", type=int, default=3, help="turns per session")
+    parser.add_argument("--tool-iterations", type=int, default=2)
+    parser.add_argument("--parallel-tools", type=int, default=2)
+    parser.add_argument("--tool-latency-ms", type=float, default=20)
+    parser.add_argument("--payload-bytes", type=int, default=2000)
+    parser.add_argument("--tool-count", type=int, default=8)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--ttft-ms", type=float, default=50)
+    parser.add_argument("--tool-cache", action="store_true", help="enable the tool result cache")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(
+        sessions=args.sessions, turns=args.turns, tool_iterations=args.tool_iterations,
+        parallel_tools=args.parallel_tools, tool_latency_ms=args.tool_latency_ms,
+        payload_bytes=args.payload_bytes, tool_count=args.tool_count,
+        pool_size=args.pool_size, ttft_ms=args.ttft_ms, tool_cache=args.tool_cache)
+    output = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Import-time benchmark for the modules the app loads at startup.
+
+Usage:
+    python -m benchmarks.bench_import --repeat 5 --output imports.json
+
+Each module is imported in a fresh interpreter with ``-X importtime`` and
+the cumulative time of its own import is taken (best of ``--repeat``).
+Modules with a budget fail the run (exit code 1) when they go over it or
+pull in ``anthropic`` / ``mcp`` at import time, so a heavy import sneaking
+back into anything the app loads shows up in CI. A module that fails to
+import fails the run too, budgeted or not.
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from .bench_chat import _git_commit
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# module -> budget in ms (None = measured only). Everything app.py imports
+# from this repo is budgeted; anthropic and mcp must load on first use only
+BUDGETS_MS = {
+    "src": 50,
+    "src.config": 50,
+    "assets.catalog": 50,
+    "src.chat_handler": 200,
+    "src.event_loop": 100,
+    "src.mcp_pool": 150,
+    "src.rate_limiter": 150,
+    "src.response_cache": 100,
+    "src.session_store": 100,
+    "src.tool_cache": 100,
+    "src.tracing": 100,
+    "streamlit": None,
+}
+# Modules that fail the run if importing them loads one of these
+FORBIDDEN_IMPORTS = ("anthropic", "mcp")
+
+_IMPORTTIME = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)")
+
+
+def import_time_ms(module: str) -> float:
+    """Cumulative import time of ``module`` in a fresh interpreter"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, cwd=ROOT)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    for line in reversed(result.stderr.splitlines()):
+        match = _IMPORTTIME.match(line)
+        if match and match.group(2) == module:
+            return int(match.group(1)) / 1000
+    raise RuntimeError(f"no importtime line for {module}")
+
+
+def loaded_modules(module: str, prefixes=("anthropic", "mcp", "streamlit", "sqlalchemy")):
+    """Which heavy third-party packages importing ``module`` pulls in"""
+    code = (f"import sys, {module}; "
+            f"print(' '.join(p for p in {list(prefixes)!r} if p in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+    return result.stdout.split()
+
+
+def run_benchmark(repeat: int = 3, budgets=None):
+    budgets = BUDGETS_MS if budgets is None else budgets
+    modules = {}
+    over_budget = []
+    for module, budget in budgets.items():
+        try:
+            best = min(import_time_ms(module) for _ in range(repeat))
+        except RuntimeError as e:
+            # A module that can't be imported can't be within budget either
+            modules[module] = {"error": str(e), "budget_ms": budget}
+            over_budget.append(module)
+            continue
+        heavy = loaded_modules(module)
+        modules[module] = {"ms": round(best, 2), "budget_ms": budget, "heavy_imports": heavy}
+        if budget is not None and (best > budget or set(heavy) & set(FORBIDDEN_IMPORTS)):
+            over_budget.append(module)
+    return {
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "repeat": repeat,
+        "modules": modules,
+        "over_budget": over_budget,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per module (best is kept)")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(repeat=args.repeat)
+    output = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    if result["over_budget"]:
+        sys.exit(f"Over import budget: {', '.join(result['over_budget'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Fake AsyncAnthropic client that scripts tool_use loops without the network"""
+import asyncio
+import json
+from typing import List, Dict, Any, Optional
+
+from anthropic.types import Message, TextBlock, ToolUseBlock, Usage
+
+
+def _current_turn_iterations(messages: List[Dict[str, Any]]) -> int:
+    """Number of assistant responses since the last plain user message"""
+    count = 0
+    for message in reversed(messages):
+        content = message["content"]
+        if message["role"] == "assistant":
+            count += 1
+        elif isinstance(content, str) or not any(
+                isinstance(block, dict) and block.get("type") == "tool_result" for block in content):
+            break
+    return count
+
+
+class FakeMessageStream:
+    def __init__(self, message: Message, ttft: float, chunk_delay: float):
+        self._message = message
+        self._ttft = ttft
+        self._chunk_delay = chunk_delay
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        await asyncio.sleep(self._ttft)
+        for block in self._message.content:
+            if block.type != "text":
+                continue
+            for word in block.text.split(" "):
+                yield word + " "
+                await asyncio.sleep(self._chunk_delay)
+
+    async def get_final_message(self) -> Message:
+        return self._message
+
+
+class FakeMessages:
+    def __init__(self, client: "FakeAsyncAnthropic"):
+        self._client = client
+
+    def stream(self, **kwargs) -> FakeMessageStream:
+        client = self._client
+        client.requests.append(kwargs)
+        return FakeMessageStream(client.respond(kwargs), client.ttft, client.chunk_delay)
+
+
+class FakeAsyncAnthropic:
+    """Scripts ``tool_iterations`` rounds of ``parallel_tools`` tool calls, then an answer.
+
+    Latency is modelled as a fixed time to first token plus a delay per
+    streamed word; token counts are estimated from the request size.
+    """
+
+    def __init__(self, tool_iterations: int = 1, parallel_tools: int = 1,
+                 ttft_ms: float = 50, chunk_delay_ms: float = 1,
+                 answer_words: int = 60, tool_names: Optional[List[str]] = None):
+        self.tool_iterations = tool_iterations
+        self.parallel_tools = parallel_tools
+        self.ttft = ttft_ms / 1000
+        self.chunk_delay = chunk_delay_ms / 1000
+        self.answer_words = answer_words
+        self.tool_names = tool_names
+        self.requests: List[Dict[str, Any]] = []
+        self.messages = FakeMessages(self)
+
+    def respond(self, request: Dict[str, Any]) -> Message:
+        messages = request["messages"]
+        iteration = _current_turn_iterations(messages)
+        tool_names = self.tool_names or [tool["name"] for tool in request.get("tools", [])]
+        tools_allowed = request.get("tool_choice", {}).get("type") != "none"
+        if iteration < self.tool_iterations and tool_names and tools_allowed:
+            content = [
+                ToolUseBlock(type="tool_use", id=f"toolu_{iteration}_{i}",
+                             name=tool_names[(iteration + i) % len(tool_names)],
+                             input={"query": f"step {iteration} part {i}"})
+                for i in range(self.parallel_tools)
+            ]
+            stop_reason = "tool_use"
+        else:
+            content = [TextBlock(type="text", text=" ".join(["answer"] * self.answer_words))]
+            stop_reason = "end_turn"
+        input_tokens = len(json.dumps(messages, default=str)) // 4 + \
+            len(json.dumps(request.get("tools", []))) // 4
+        return Message(
+            id=f"msg_{len(self.requests)}", type="message", role="assistant",
+            model=request["model"], content=content, stop_reason=stop_reason,
+            usage=Usage(input_tokens=input_tokens,
+                        output_tokens=self.answer_words if stop_reason == "end_turn" else 20))
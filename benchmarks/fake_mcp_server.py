@@ -0,0 +1,44 @@
+"""Stand-in stdio MCP server with configurable latency and payload size.
+
+Run directly (``python benchmarks/fake_mcp_server.py --latency-ms 50``) or
+point ``MCPClient(command=sys.executable, args=[...])`` at it.
+"""
+import argparse
+import asyncio
+import logging
+import os
+
+from mcp.server.fastmcp import FastMCP
+
+
+def build_server(tool_count: int, latency_ms: float, payload_bytes: int) -> FastMCP:
+    server = FastMCP("gala-deck-bench", log_level="WARNING")
+    filler = ("lorem ipsum dolor sit amet " * (payload_bytes // 27 + 1))[:payload_bytes]
+
+    def make_tool(index):
+        async def lookup(query: str) -> str:
+            await asyncio.sleep(latency_ms / 1000)
+            return f"[tool_{index}] {query}: {filler}"
+        return lookup
+
+    for index in range(tool_count):
+        server.add_tool(
+            make_tool(index),
+            name=f"lookup_{index}",
+            description=f"Look up section {index} of the API documentation for a query",
+        )
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", type=int, default=int(os.getenv("FAKE_MCP_TOOLS", "8")))
+    parser.add_argument("--latency-ms", type=float, default=float(os.getenv("FAKE_MCP_LATENCY_MS", "20")))
+    parser.add_argument("--payload-bytes", type=int, default=int(os.getenv("FAKE_MCP_PAYLOAD_BYTES", "2000")))
+    args = parser.parse_args()
+    logging.getLogger("mcp").setLevel(logging.WARNING)
+    build_server(args.tools, args.latency_ms, args.payload_bytes).run("stdio")
+
+
+if __name__ == "__main__":
+    main()
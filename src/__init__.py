@@ -1,15 +1,39 @@
-"""Gala Deck Chat - Core modules"""
-from .chat_handler import ChatHandler
-from .mcp_client import MCPClient
-from .errors import MCPError, MCPConnectionError, APICreditsError
-from .config import APP_TITLE, MODEL_NAME
-
-__all__ = [
-    "ChatHandler",
-    "MCPClient",
-    "MCPError",
-    "MCPConnectionError",
-    "APICreditsError",
-    "APP_TITLE",
-    "MODEL_NAME",
-]
+"""Gala Deck Chat - Core modules
+
+Exports are imported on first access, so ``import src`` (and every
+``from src.config import ...``) stays cheap; ``anthropic`` and ``mcp`` load
+only when ``ChatHandler`` or ``MCPClient`` is actually used.
+"""
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .chat_handler import ChatHandler
+    from .mcp_client import MCPClient
+    from .errors import MCPError, MCPConnectionError, APICreditsError
+    from .config import APP_TITLE, MODEL_NAME
+
+_EXPORTS = {
+    "ChatHandler": ".chat_handler",
+    "MCPClient": ".mcp_client",
+    "MCPError": ".errors",
+    "MCPConnectionError": ".errors",
+    "APICreditsError": ".errors",
+    "APP_TITLE": ".config",
+    "MODEL_NAME": ".config",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
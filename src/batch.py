@@ -0,0 +1,163 @@
+"""Headless batch runner: stream a JSONL file of conversations through ChatHandler.
+
+Usage:
+    python -m src.batch questions.jsonl --output answers.jsonl --concurrency 8
+
+Each input line is a JSON object with an ``id`` (or ``request_id``) and
+either ``messages`` (a conversation ending in a user turn) or a single
+prompt under ``--prompt-field`` (default ``prompt``). One result line is
+appended to the output per record as soon as it finishes. The output file
+doubles as the checkpoint: records already answered there are skipped on
+re-run, so an interrupted batch resumes where it stopped. Malformed lines
+get an ``error`` result instead of stopping the batch. The shared response
+cache is bypassed unless ``--use-cache`` is given, so a batch neither answers
+from nor fills the app's cache by default.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, Any, Iterator, Optional, Set, Tuple
+
+from .chat_handler import ChatHandler
+from .config import calculate_cost
+from .response_cache import ResponseCache
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def parse_record(line: str, line_number: int,
+                 prompt_field: str = "prompt") -> Tuple[str, Optional[list], Optional[str]]:
+    """``(record_id, messages, error)`` for one input line; messages is None when invalid"""
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        return str(line_number), None, f"invalid JSON on line {line_number}: {e}"
+    if not isinstance(record, dict):
+        return str(line_number), None, f"line {line_number} is not a JSON object"
+    record_id = str(record.get("id", record.get("request_id", line_number)))
+    if "messages" in record:
+        messages = record["messages"]
+        if (not isinstance(messages, list) or not messages or
+                not all(isinstance(m, dict) and "role" in m and "content" in m for m in messages)):
+            return record_id, None, "'messages' must be a non-empty list of {role, content} objects"
+        return record_id, messages, None
+    prompt = record.get(prompt_field)
+    if not isinstance(prompt, str) or not prompt.strip():
+        return record_id, None, f"record has neither 'messages' nor a '{prompt_field}' string"
+    return record_id, [{"role": "user", "content": prompt}], None
+
+
+def read_records(path: str,
+                 prompt_field: str = "prompt") -> Iterator[Tuple[str, Optional[list], Optional[str]]]:
+    """Yield ``(record_id, messages, error)`` lazily from a JSONL file"""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                yield parse_record(line, line_number, prompt_field)
+
+
+def load_completed_ids(path: str) -> Set[str]:
+    """Ids with a successful result in an existing output file"""
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial line from a crash
+            if result.get("status") == "ok":
+                completed.add(result["id"])
+    return completed
+
+
+async def run_batch(handler: ChatHandler, input_path: str, output_path: str,
+                    concurrency: int = 4, prompt_field: str = "prompt") -> Dict[str, Any]:
+    """Process every pending record with at most ``concurrency`` turns in flight"""
+    completed = load_completed_ids(output_path)
+    slots = asyncio.Semaphore(concurrency)
+    pending = set()
+    totals = {"ok": 0, "error": 0, "skipped": 0, "total_cost": 0.0,
+              "input_tokens": 0, "output_tokens": 0}
+    started = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        def write(result):
+            totals[result["status"]] += 1
+            out.write(json.dumps(result, default=str) + "\n")
+            out.flush()
+
+        async def process(record_id, messages):
+            turn_started = time.perf_counter()
+            try:
+                text, usage = await handler.achat(list(messages))
+                result = {"id": record_id, "status": "ok", "response": text,
+                          "usage": usage, "cost": calculate_cost(usage)}
+                totals["input_tokens"] += usage.get("input_tokens", 0)
+                totals["output_tokens"] += usage.get("output_tokens", 0)
+                totals["total_cost"] += result["cost"]
+            except Exception as e:
+                result = {"id": record_id, "status": "error", "error": handler.error_message(e)}
+            result["models"] = sorted(result.get("usage", {}).get("by_model", {}))
+            result["latency_ms"] = round((time.perf_counter() - turn_started) * 1000, 2)
+            write(result)
+
+        try:
+            for record_id, messages, error in read_records(input_path, prompt_field):
+                if record_id in completed:
+                    totals["skipped"] += 1
+                    continue
+                if error:
+                    logger.warning(f"Skipping record {record_id}: {error}")
+                    write({"id": record_id, "status": "error", "error": error})
+                    continue
+                await slots.acquire()  # backpressure: never read further ahead than the free slots
+                task = asyncio.create_task(process(record_id, messages))
+                task.add_done_callback(lambda _: slots.release())
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            # Turns already in flight are paid for: let them write their results
+            # even if reading the input failed
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    elapsed = time.perf_counter() - started
+    processed = totals["ok"] + totals["error"]
+    totals["elapsed_s"] = round(elapsed, 3)
+    totals["records_per_s"] = round(processed / elapsed, 3) if elapsed else 0.0
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a JSONL file of conversations through ChatHandler")
+    parser.add_argument("input", help="JSONL file of conversations")
+    parser.add_argument("--output", required=True, help="JSONL results file (appended; also the checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=4, help="turns in flight at once")
+    parser.add_argument("--prompt-field", default="prompt",
+                        help="field holding the prompt when a record has no 'messages'")
+    parser.add_argument("--use-cache", action="store_true",
+                        help="answer from and fill the shared response cache")
+    args = parser.parse_args(argv)
+
+    from anthropic import AsyncAnthropic
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        sys.exit("ANTHROPIC_API_KEY is not set")
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # Without --use-cache a disabled in-process cache stands in for the shared one
+    response_cache = None if args.use_cache else ResponseCache(path=None)
+    handler = ChatHandler(AsyncAnthropic(api_key=api_key, max_retries=0),
+                          response_cache=response_cache)
+    totals = handler._background.run(run_batch(
+        handler, args.input, args.output, args.concurrency, args.prompt_field))
+    print(json.dumps(totals, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,68 +1,370 @@
 """Chat handler for managing conversations with Claude"""
-from .errors import APICreditsError, APIAuthError, APIRateLimitError, MCPConnectionError
-from .mcp_client import MCPClient
-from .config import MODEL_NAME, MAX_TOKENS
+from .errors import (APICreditsError, APIAuthError, APIRateLimitError, MCPConnectionError,
+                     MCPPoolTimeoutError, is_tool_error)
+from .event_loop import BackgroundLoop, get_background_loop
+from .history import (CHARS_PER_TOKEN, HistoryManager, _block_to_dict, _block_type,
+                      _is_tool_result_message)
+from .local_tools import call_local_tool, is_local_tool, tool_definitions
+from .mcp_pool import MCPSessionPool, get_mcp_pool
+from .model_router import ModelRouter
+from .rate_limiter import RateLimiter, get_rate_limiter
+from .response_cache import ResponseCache, get_response_cache
+from .tool_selector import ToolIndex
+from .tracing import TraceRecorder, TurnTrace, get_trace_recorder, span
+from .config import (MODEL_NAME, MAX_TOKENS, calculate_cost, TOOL_CALL_CONCURRENCY, PROMPT_CACHING,
+                     MAX_TOOL_ITERATIONS, LOCAL_TOOLS_ENABLED, TURN_DEADLINE_SECONDS, FINAL_ANSWER_TIMEOUT_SECONDS)
 import asyncio
+import json
+import time
 import traceback
-from typing import List, Dict, Any
-from anthropic import Anthropic, BadRequestError, AuthenticationError, RateLimitError
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, AsyncIterator, Callable, Iterator, Tuple
 import logging
 
+if TYPE_CHECKING:  # the SDK is imported on the first Claude call
+    from anthropic import AsyncAnthropic
+
 logger = logging.getLogger(__name__)
 
+# Appended to the last user message when the tool loop is cut short
+STOP_INSTRUCTION = {
+    "max_iterations": "the tool call budget for this question is used up. "
+                      "Answer now using only the information gathered so far.",
+    "deadline": "the time budget for this question is used up. "
+                "Answer now using only the information gathered so far.",
+}
+
 
 class ChatHandler:
     """Handles chat interactions using MCP tools"""
 
-    def __init__(self, anthropic_client: Anthropic):
+    def __init__(self, anthropic_client: "AsyncAnthropic",
+                 mcp_pool: Optional[MCPSessionPool] = None,
+                 background_loop: Optional[BackgroundLoop] = None,
+                 history: Optional[HistoryManager] = None,
+                 recorder: Optional[TraceRecorder] = None,
+                 limiter: Optional[RateLimiter] = None,
+                 router: Optional[ModelRouter] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 local_tools: bool = LOCAL_TOOLS_ENABLED):
         self.client = anthropic_client
+        self.mcp = mcp_pool or get_mcp_pool()
+        self.history = history or HistoryManager()
+        self.recorder = recorder or get_trace_recorder()
+        self.limiter = limiter or get_rate_limiter()
+        self.router = router or ModelRouter()
+        self.response_cache = response_cache or get_response_cache()
+        self.session_cost = 0.0  # feeds the router's session budget rule
+        # Every turn runs on one long-lived loop so the HTTP connection pool
+        # and MCP sessions are reused instead of rebuilt per message
+        self._background = background_loop or get_background_loop()
+        self._tool_index: Optional[ToolIndex] = None
+        self.local_tools = local_tools
+        self._mcp_tools: Optional[List[Dict[str, Any]]] = None
+        self._all_tools: List[Dict[str, Any]] = []
 
     async def _process_message(self, messages: List[Dict[str, Any]]) -> tuple[str, Dict[str, Any]]:
         """Process a message with tool support"""
+        async for event in self._stream_message(messages):
+            if event["type"] == "done":
+                return event["text"], event["usage"]
+
+    async def _stream_message(self, messages: List[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """Run one turn, yielding text deltas and tool status events.
+
+        Event types: ``text`` (``text``), ``tool_use`` / ``tool_done``
+        (``name``) and a final ``done`` (``text``, ``usage``). The turn runs
+        in its own task so its deadline can cancel everything in flight;
+        closing this generator early cancels the turn as well.
+        """
+        events: asyncio.Queue = asyncio.Queue()
+        turn = asyncio.create_task(self._run_turn(messages, events.put_nowait))
+        try:
+            while True:
+                event = await events.get()
+                if event["type"] == "error":
+                    raise event["error"]
+                yield event
+                if event["type"] == "done":
+                    return
+        finally:
+            if not turn.done():
+                turn.cancel()
+            await asyncio.gather(turn, return_exceptions=True)
+
+    async def _run_turn(self, messages, emit: Callable[[Dict[str, Any]], None]):
+        """Producer side of ``_stream_message``; always ends with ``done`` or ``error``"""
         total_usage = self._initialize_usage()
-        mcp_client = MCPClient()
-        stdio_conn = mcp_client.get_tools_and_session()
+        trace = TurnTrace()
+        total_usage["turn_id"] = trace.turn_id  # lets callers find this turn's trace
+        started = time.perf_counter()
+        try:
+            with trace.activate():
+                cache_key, model = self._response_cache_key(messages)
+                cached = self._cached_response(cache_key, trace)
+                if cached is None:
+                    text = await self._tool_loop(messages, emit, total_usage, trace)
+                else:
+                    text = cached["text"]
+                    emit({"type": "text", "text": text})
+                    total_usage["cache_hit"] = True
+                    total_usage["latency_saved_ms"] = self.response_cache.record_hit(
+                        cached["latency_ms"], (time.perf_counter() - started) * 1000)
+            emit({"type": "done", "text": text, "usage": total_usage})
+            # Answers built on failed tool calls (e.g. an MCP outage) are not replayed
+            if (cached is None and cache_key and "stop_cause" not in total_usage
+                    and not total_usage["tool_errors"]):
+                self.response_cache.put(cache_key, model, text, (time.perf_counter() - started) * 1000)
+        except Exception as e:
+            trace.attrs["error"] = type(e).__name__
+            emit({"type": "error", "error": e})
+        finally:
+            trace.attrs.update(total_usage)
+            self.recorder.record(trace)
+            self.session_cost += calculate_cost(total_usage)
+
+    def _response_cache_key(self, messages):
+        """``(key, model)`` for the response cache, or ``(None, None)`` when it is off"""
+        if not self.response_cache.enabled:
+            return None, None
+        model, _ = self.router.choose(self._question_text(messages), False, self.session_cost)
+        return ResponseCache.make_key(messages, model), model
+
+    def _cached_response(self, cache_key, trace: TurnTrace):
+        if cache_key is None:
+            return None
+        with trace.span("response_cache.get") as record:
+            cached = self.response_cache.get(cache_key)
+            record["hit"] = cached is not None
+        return cached
+
+    async def _tool_loop(self, messages, emit, total_usage, trace: TurnTrace) -> str:
+        """Alternate Claude calls and tool calls within the turn's iteration and time budget"""
+        with trace.span("mcp.get_tools"):
+            tools = self._with_local_tools(await self.mcp.get_tools())
+        # Chosen once per turn so every request in the loop shares a cacheable prefix
+        question = self._question_text(messages)
+        with trace.span("tools.select") as record:
+            tools, selection = self._select_tools(question, messages, tools)
+            record.update(selection)
+
+        deadline = asyncio.get_running_loop().time() + TURN_DEADLINE_SECONDS
+        unanswered = None  # assistant response whose tool_use blocks have no results yet
+        try:
+            async with asyncio.timeout_at(deadline):
+                iteration = 0
+                while True:
+                    total_usage["tool_schema_tokens_saved"] += selection["schema_tokens_saved"]
+                    response = await self._call_claude_api(
+                        self._compact(messages, trace), tools, total_usage, trace, emit,
+                        route=self.router.choose(question, iteration > 0, self.session_cost))
+                    if response.stop_reason != "tool_use":
+                        return self._extract_final_response(response)
+
+                    messages.append({"role": "assistant", "content": response.content})
+                    unanswered = response
+                    if iteration >= MAX_TOOL_ITERATIONS:
+                        stop_cause = "max_iterations"
+                        break
+
+                    tool_names = [block.name for block in response.content if block.type == "tool_use"]
+                    for name in tool_names:
+                        emit({"type": "tool_use", "name": name})
+                    with trace.span("tools", count=len(tool_names)):
+                        results = await self._handle_tool_calls(response)
+                    messages.append(results)
+                    total_usage["tool_errors"] += sum(
+                        1 for block in results["content"] if block.get("is_error"))
+                    unanswered = None
+                    for name in tool_names:
+                        emit({"type": "tool_done", "name": name})
+                    iteration += 1
+        except TimeoutError:
+            stop_cause = "deadline"
+        except BaseException as e:
+            # Failed or cancelled mid-round (e.g. the stream was closed by a
+            # rerun): every tool_use in the history still needs its result
+            if unanswered is not None:
+                cause = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+                messages.append(self._skipped_tool_results(unanswered, cause))
+            raise
+
+        logger.warning(f"Tool loop stopped early: {stop_cause}")
+        total_usage["stop_cause"] = stop_cause
+        trace.attrs["stop_cause"] = stop_cause
+        if unanswered is not None:
+            messages.append(self._skipped_tool_results(unanswered, stop_cause))
+            for block in unanswered.content:
+                if block.type == "tool_use":
+                    emit({"type": "tool_done", "name": block.name})
+        total_usage["tool_schema_tokens_saved"] += selection["schema_tokens_saved"]
+        route = self.router.choose(question, True, self.session_cost)
+        return await self._final_answer(messages, tools, total_usage, trace, emit, stop_cause, route)
+
+    def _with_local_tools(self, mcp_tools):
+        """MCP tools plus the in-process card tools, as one stable list"""
+        if not self.local_tools:
+            return mcp_tools
+        if self._mcp_tools is not mcp_tools:
+            self._mcp_tools = mcp_tools
+            self._all_tools = mcp_tools + tool_definitions()
+        return self._all_tools
+
+    def _question_text(self, messages) -> str:
+        """Text of the user message that started the current turn"""
+        question = next((m for m in reversed(messages)
+                         if m["role"] == "user" and not _is_tool_result_message(m)), None)
+        return self.history._text_of(question) if question else ""
+
+    def _select_tools(self, question, messages, tools):
+        """Tools relevant to the current question, plus any already used in the history"""
+        if self._tool_index is None or self._tool_index.tools is not tools:
+            self._tool_index = ToolIndex(tools)
+        used = {_block_to_dict(block)["name"]
+                for message in messages
+                if message["role"] == "assistant" and not isinstance(message["content"], str)
+                for block in message["content"] if _block_type(block) == "tool_use"}
+        return self._tool_index.select(question, required=used)
+
+    async def _final_answer(self, messages, tools, total_usage, trace, emit, stop_cause, route) -> str:
+        """Ask Claude to answer from what was gathered so far, with tools disabled"""
+        request_messages = self._compact(messages, trace)
+        last = request_messages[-1]
+        content = last["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        request_messages[-1] = {**last, "content": list(content) + [
+            {"type": "text", "text": STOP_INSTRUCTION[stop_cause]}]}
+        try:
+            async with asyncio.timeout(FINAL_ANSWER_TIMEOUT_SECONDS):
+                response = await self._call_claude_api(
+                    request_messages, tools, total_usage, trace, emit, route=route,
+                    tool_choice={"type": "none"})
+            return self._extract_final_response(response)
+        except TimeoutError:
+            text = "⏱️ Sorry, this question took too long to answer. Please try a narrower question."
+            emit({"type": "text", "text": text})
+            return text
+
+    def _skipped_tool_results(self, response, stop_cause):
+        """tool_result blocks for tool calls that were cancelled or never started"""
+        return {
+            "role": "user",
+            "content": [{
+                "type": "tool_result",
+                "tool_use_id": block.id,
+                "content": f"Not run: the turn was stopped early ({stop_cause})",
+                "is_error": True
+            } for block in response.content if block.type == "tool_use"]
+        }
+
+    def _compact(self, messages, trace: TurnTrace):
+        with trace.span("history.compact"):
+            return self.history.compact(messages)
+
+    async def _call_claude_api(self, messages, tools, total_usage, trace: TurnTrace, emit,
+                               route: Tuple[str, str] = (MODEL_NAME, "default"),
+                               tool_choice: Optional[Dict[str, Any]] = None):
+        """Stream one Claude API call, emitting text deltas; return the final message.
 
-        async with stdio_conn as (read, write):
-            session, tools = await mcp_client.initialize_session(read, write)
-            response = await self._call_claude_api(messages, tools, total_usage)
+        Calls go through the shared rate limiter. Rate-limit, overload and
+        connection errors are retried with backoff, but only while nothing
+        has been streamed yet, so the UI never sees duplicated text.
+        """
+        from anthropic import APIError, BadRequestError
+        estimated_tokens = self.history.total_tokens(messages) + len(json.dumps(tools)) // CHARS_PER_TOKEN
+        extra = {"tool_choice": tool_choice} if tool_choice else {}
+        model, reason = route
+        with trace.span("claude.call", model=model, route=reason) as record:
+            attempt = 0
+            while True:
+                streamed = False
+                try:
+                    async with self.limiter.request(estimated_tokens):
+                        async with self.client.messages.stream(
+                            model=model,
+                            max_tokens=MAX_TOKENS,
+                            tools=self._cached_tools(tools),
+                            messages=self._cached_messages(messages),
+                            **extra
+                        ) as stream:
+                            async for text in stream.text_stream:
+                                if not streamed:
+                                    streamed = True
+                                    record["ttft_ms"] = trace.elapsed_ms(record)
+                                emit({"type": "text", "text": text})
+                            response = await stream.get_final_message()
+                    break
+                except BadRequestError as e:
+                    self._handle_api_errors(e)
+                except APIError as e:
+                    if streamed:
+                        raise
+                    delay = self.limiter.retry_delay(e, attempt)
+                attempt += 1
+                record["retries"] = attempt
+                await asyncio.sleep(delay)
+            self.limiter.record_usage(estimated_tokens, response.usage.input_tokens)
+            record["input_tokens"] = response.usage.input_tokens
+            record["output_tokens"] = response.usage.output_tokens
+        self._track_usage(response, total_usage, model, record["duration_ms"])
+        return response
 
-            while response.stop_reason == "tool_use":
-                tool_results = await self._handle_tool_calls(response, mcp_client, session)
-                messages.extend(tool_results)
-                response = await self._call_claude_api(messages, tools, total_usage)
+    def _cached_tools(self, tools):
+        """Copy of tools with a cache breakpoint after the last definition"""
+        if not PROMPT_CACHING or not tools:
+            return tools
+        return tools[:-1] + [{**tools[-1], "cache_control": {"type": "ephemeral"}}]
 
-            return self._extract_final_response(response), total_usage
+    def _cached_messages(self, messages):
+        """Copy of messages with a cache breakpoint on the newest content block.
 
-    async def _call_claude_api(self, messages, tools, total_usage):
-        """Call the Claude API and track usage."""
+        Each tool-loop iteration moves the breakpoint forward, so the next
+        request reads everything before it from the cache.
+        """
+        if not PROMPT_CACHING or not messages:
+            return messages
+        last = messages[-1]
+        content = last["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        if not content:
+            return messages
+        block = content[-1]
+        if not isinstance(block, dict):
+            block = block.model_dump(exclude_none=True)
+        content = list(content[:-1]) + [{**block, "cache_control": {"type": "ephemeral"}}]
+        return messages[:-1] + [{**last, "content": content}]
+
+    async def _handle_tool_calls(self, response):
+        """Run the response's tool calls concurrently and return one tool_result message."""
+        tool_blocks = [block for block in response.content if block.type == "tool_use"]
+        limit = asyncio.Semaphore(TOOL_CALL_CONCURRENCY)
+
+        async def run(block):
+            if is_local_tool(block.name):
+                with span("local.call_tool", tool=block.name):
+                    return call_local_tool(block.name, block.input)
+            async with limit:
+                return await self.mcp.call_tool(block.name, block.input)
+
+        tasks = [asyncio.ensure_future(run(block)) for block in tool_blocks]
         try:
-            response = self.client.messages.create(
-                model=MODEL_NAME,
-                max_tokens=MAX_TOKENS,
-                tools=tools,
-                messages=messages
-            )
-            self._track_usage(response, total_usage)
-            return response
-        except BadRequestError as e:
-            self._handle_api_errors(e)
-
-    async def _handle_tool_calls(self, response, mcp_client, session):
-        """Process tool calls and return results."""
-        tool_results = []
-        for block in response.content:
-            if block.type == "tool_use":
-                result_str = await mcp_client.call_tool(session, block.name, block.input)
-                tool_results.append({
-                    "role": "user",
-                    "content": [{
-                        "type": "tool_result",
-                        "tool_use_id": block.id,
-                        "content": result_str
-                    }]
-                })
-        return tool_results
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            # The turn is failing: don't leave sibling calls holding pool workers
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return {
+            "role": "user",
+            "content": [{
+                "type": "tool_result",
+                "tool_use_id": block.id,
+                "content": result,
+                **({"is_error": True} if is_tool_error(result) else {})
+            } for block, result in zip(tool_blocks, results)]
+        }
 
     def _initialize_usage(self):
         return {
@@ -70,16 +372,35 @@ class ChatHandler:
             "output_tokens": 0,
             "cache_creation_input_tokens": 0,
             "cache_read_input_tokens": 0,
+            "tool_schema_tokens_saved": 0,
+            "tool_errors": 0,
+            "by_model": {},
         }
 
-    def _track_usage(self, response, total_usage):
+    def _track_usage(self, response, total_usage, model=MODEL_NAME, latency_ms=0.0):
+        """Add a response's token counts to the turn totals and to its model's totals"""
         if hasattr(response, 'usage'):
-            total_usage["input_tokens"] += response.usage.input_tokens
-            total_usage["output_tokens"] += response.usage.output_tokens
-            total_usage["cache_creation_input_tokens"] += getattr(
-                response.usage, 'cache_creation_input_tokens', 0)
-            total_usage["cache_read_input_tokens"] += getattr(
-                response.usage, 'cache_read_input_tokens', 0)
+            model_usage = total_usage.setdefault("by_model", {}).setdefault(model, {
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "cache_creation_input_tokens": 0,
+                "cache_read_input_tokens": 0,
+                "calls": 0,
+                "latency_ms": 0.0,
+            })
+            counts = {
+                "input_tokens": response.usage.input_tokens,
+                "output_tokens": response.usage.output_tokens,
+                "cache_creation_input_tokens": getattr(
+                    response.usage, 'cache_creation_input_tokens', 0) or 0,
+                "cache_read_input_tokens": getattr(
+                    response.usage, 'cache_read_input_tokens', 0) or 0,
+            }
+            for key, value in counts.items():
+                total_usage[key] += value
+                model_usage[key] += value
+            model_usage["calls"] += 1
+            model_usage["latency_ms"] += latency_ms
 
     def _extract_final_response(self, response):
         return "".join(block.text for block in response.content if hasattr(block, "text"))
@@ -89,24 +410,83 @@ class ChatHandler:
             raise APICreditsError()
         raise Exception(f"❌ **API Error**\n\n{str(error)}")
 
+    def error_message(self, error: Exception) -> str:
+        """Log a failed turn and return the text shown to the user"""
+        if isinstance(error, MCPConnectionError):
+            logger.error(f"MCP Connection Error: {str(error)}")
+            return f"🔧 **MCP Connection Failed**\n\n{str(error)}"
+        if isinstance(error, (APICreditsError, APIAuthError, APIRateLimitError, MCPPoolTimeoutError)):
+            logger.error(f"API Error: {str(error)}")
+            return str(error)
+        if hasattr(error, '__cause__') and hasattr(error.__cause__, 'exceptions'):
+            logger.error("Multiple exceptions occurred:")
+            for sub_exception in error.__cause__.exceptions:
+                logger.error(f"Sub-exception: {sub_exception}")
+        else:
+            logger.error(f"Unexpected error: {str(error)}", exc_info=True)
+        return str(error)
+
     def chat(self, messages: List[Dict[str, Any]]) -> tuple[str, Dict[str, Any]]:
         """Synchronous wrapper for chat processing"""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
         try:
-            return loop.run_until_complete(self._process_message(messages))
-        except MCPConnectionError as e:
-            logger.error(f"MCP Connection Error: {str(e)}")
-            return f"🔧 **MCP Connection Failed**\n\n{str(e)}", {}
-        except (APICreditsError, APIAuthError, APIRateLimitError) as e:
-            logger.error(f"API Error: {str(e)}")
-            return str(e), {}
+            return self._background.run(self._process_message(messages))
+        except Exception as e:
+            return self.error_message(e), {}
+
+    async def achat(self, messages: List[Dict[str, Any]]) -> tuple[str, Dict[str, Any]]:
+        """Run one turn on the caller's loop; raises instead of returning error text.
+
+        For callers that drive many turns concurrently on the background loop,
+        such as the batch runner. Pair with ``error_message`` to render failures.
+        """
+        return await self._process_message(messages)
+
+    def chat_stream(self, messages: List[Dict[str, Any]],
+                    on_tool: Optional[Callable[[Dict[str, Any]], None]] = None) -> "ChatStream":
+        """Synchronous streaming wrapper, suitable for ``st.write_stream``"""
+        return ChatStream(self, messages, on_tool)
+
+
+class ChatStream:
+    """Iterates text deltas of one chat turn; ``usage`` is filled in at the end.
+
+    Tool status events are passed to ``on_tool`` instead of being yielded, so
+    the iterated text is exactly the assistant's reply.
+    """
+
+    def __init__(self, handler: ChatHandler, messages: List[Dict[str, Any]],
+                 on_tool: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.handler = handler
+        self.messages = messages
+        self.on_tool = on_tool
+        self.text = ""
+        self.usage: Dict[str, Any] = {}
+
+    def __iter__(self) -> Iterator[str]:
+        background = self.handler._background
+        events = self.handler._stream_message(self.messages)
+        needs_break = False
+        try:
+            while True:
+                try:
+                    event = background.run(events.__anext__())
+                except StopAsyncIteration:
+                    break
+                if event["type"] == "text":
+                    text = event["text"]
+                    if needs_break and text.strip():
+                        text, needs_break = "\n\n" + text, False
+                    self.text += text
+                    yield text
+                elif event["type"] == "done":
+                    self.usage = event["usage"]
+                else:
+                    needs_break = bool(self.text)
+                    if self.on_tool:
+                        self.on_tool(event)
         except Exception as e:
-            if hasattr(e, '__cause__') and hasattr(e.__cause__, 'exceptions'):
-                logger.error("Multiple exceptions occurred:")
-                for sub_exception in e.__cause__.exceptions:
-                    logger.error(f"Sub-exception: {sub_exception}")
-            else:
-                logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+            error_text = self.handler.error_message(e)
+            self.text += error_text
+            yield error_text
         finally:
-            loop.close()
+            background.run(events.aclose())
@@ -1,30 +1,113 @@
 """Configuration and constants"""
+import json
 import os
 from typing import Dict
 
 # Model configuration
 MODEL_NAME = "claude-sonnet-4-20250514"
 MAX_TOKENS = 4096
+# Requests matching the routing rules in src/model_router.py use this model
+# instead; routing is opt-in (empty = every request uses MODEL_NAME)
+FAST_MODEL_NAME = os.getenv("FAST_MODEL_NAME", "")
+ROUTE_SHORT_PROMPT_CHARS = int(os.getenv("ROUTE_SHORT_PROMPT_CHARS", "0"))  # 0 disables
+ROUTE_TOOL_CONTINUATIONS = os.getenv("ROUTE_TOOL_CONTINUATIONS", "0") != "0"
+SESSION_BUDGET_USD = float(os.getenv("SESSION_BUDGET_USD", "0"))  # 0 = no budget
+# Mark the tool list and conversation prefix as cacheable on every request
+PROMPT_CACHING = os.getenv("PROMPT_CACHING", "1") != "0"
+
+# Client-side limits shared by every Claude call in the process (0 = unlimited)
+CLAUDE_RPM = float(os.getenv("CLAUDE_RPM", "50"))  # requests per minute
+CLAUDE_ITPM = float(os.getenv("CLAUDE_ITPM", "30000"))  # input tokens per minute
+CLAUDE_MAX_IN_FLIGHT = int(os.getenv("CLAUDE_MAX_IN_FLIGHT", "8"))
+# Retries for 429/529/connection errors, with jittered exponential backoff
+CLAUDE_MAX_RETRIES = int(os.getenv("CLAUDE_MAX_RETRIES", "4"))
+CLAUDE_RETRY_BASE_DELAY = float(os.getenv("CLAUDE_RETRY_BASE_DELAY", "1.0"))
+CLAUDE_RETRY_MAX_DELAY = float(os.getenv("CLAUDE_RETRY_MAX_DELAY", "30"))
 
 # MCP Server configuration
 MCP_SERVER_COMMAND = "node"
 MCP_SERVER_PATH = os.path.abspath("vapi-doc-coding-mcp/build/index.js")
 
+# MCP worker pool shared by all chat sessions in the process
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "4"))  # max server processes
+MCP_POOL_MIN_SIZE = int(os.getenv("MCP_POOL_MIN_SIZE", "1"))  # started on warm-up
+MCP_POOL_ACQUIRE_TIMEOUT = float(os.getenv("MCP_POOL_ACQUIRE_TIMEOUT", "30"))
+# Max tool calls from one assistant response that run at the same time
+TOOL_CALL_CONCURRENCY = int(os.getenv("TOOL_CALL_CONCURRENCY", "4"))
+# Per-turn budget for the tool loop; when hit, Claude answers from what it has
+MAX_TOOL_ITERATIONS = int(os.getenv("MAX_TOOL_ITERATIONS", "8"))
+TURN_DEADLINE_SECONDS = float(os.getenv("TURN_DEADLINE_SECONDS", "90"))
+FINAL_ANSWER_TIMEOUT_SECONDS = float(os.getenv("FINAL_ANSWER_TIMEOUT_SECONDS", "30"))
+
+# Only the most relevant tools are sent with each request (0 sends them all);
+# below the minimum relevance score the full list is sent instead
+TOOL_SELECTION_TOP_K = int(os.getenv("TOOL_SELECTION_TOP_K", "8"))
+TOOL_SELECTION_MIN_SCORE = float(os.getenv("TOOL_SELECTION_MIN_SCORE", "1.0"))
+
+# Card lookup tools answered in-process from assets/cards.json (src/local_tools.py)
+LOCAL_TOOLS_ENABLED = os.getenv("LOCAL_TOOLS_ENABLED", "1") != "0"
+
+# Tool result cache (vapi doc tools are deterministic for the same arguments)
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "512"))
+TOOL_CACHE_TTL = float(os.getenv("TOOL_CACHE_TTL", "3600"))  # seconds; 0 disables
+# Per-tool overrides, e.g. '{"search_docs": 86400, "get_time": 0}'
+TOOL_CACHE_TOOL_TTLS = json.loads(os.getenv("TOOL_CACHE_TOOL_TTLS", "{}"))
+TOOL_CACHE_PATH = os.getenv("TOOL_CACHE_PATH")  # SQLite file; unset = memory only
+
+# Final answers to identical conversations are reused from this SQLite file
+# (empty path or a TTL of 0 disables the cache)
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "cache/responses.sqlite3")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "86400"))  # seconds
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+
+# Conversation history sent to Claude is compacted to fit this estimate
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "60000"))
+# Tool results from this many most recent turns are sent in full
+HISTORY_KEEP_TOOL_RESULTS_TURNS = int(os.getenv("HISTORY_KEEP_TOOL_RESULTS_TURNS", "1"))
+
+# Chat history and usage totals per session: "memory" keeps them in this
+# process, "sql" in the assets/database.py database shared by every replica
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "256"))  # sessions held in memory
+SESSION_FLUSH_BATCH = int(os.getenv("SESSION_FLUSH_BATCH", "20"))  # turn records per write
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "1.0"))  # max seconds queued
+SESSION_FLUSH_MAX_ATTEMPTS = int(os.getenv("SESSION_FLUSH_MAX_ATTEMPTS", "5"))  # then dropped
+SESSION_MAX_PENDING = int(os.getenv("SESSION_MAX_PENDING", "10000"))  # queued records kept
+
+# Per-turn latency traces (JSONL, rotated by size); empty path disables the file
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH", "logs/turns.jsonl")
+TRACE_LOG_MAX_BYTES = int(os.getenv("TRACE_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_LOG_BACKUPS = int(os.getenv("TRACE_LOG_BACKUPS", "5"))
+TRACE_HISTORY_SIZE = int(os.getenv("TRACE_HISTORY_SIZE", "500"))  # turns kept for percentiles
+
+# Text of a single tool result sent back to Claude is truncated beyond this
+TOOL_RESULT_MAX_CHARS = int(os.getenv("TOOL_RESULT_MAX_CHARS", "20000"))
+
 # UI configuration
 APP_TITLE = "🔮 Gala Deck Chat"
 CHAT_PLACEHOLDER = "Ask about Vedic Astro API..."
+# Messages rendered on each rerun; older ones sit behind a "show earlier" button
+CHAT_HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "20"))
 PRICING = {
     "claude-sonnet-4-20250514": {
         "input": 3.00,   # $3 per million input tokens
         "output": 15.00,  # $15 per million output tokens
         "cache_write": 3.75,  # $3.75 per million tokens
         "cache_read": 0.30,   # $0.30 per million tokens
-    }
+    },
+    "claude-3-5-haiku-20241022": {
+        "input": 0.80,
+        "output": 4.00,
+        "cache_write": 1.00,
+        "cache_read": 0.08,
+    },
 }
 
 
 def calculate_cost(usage: Dict[str, int], model: str = MODEL_NAME) -> float:
     """Calculate approximate cost in USD"""
+    if "by_model" in usage:
+        return sum(calculate_cost(model_usage, name) for name, model_usage in usage["by_model"].items())
     if model not in PRICING:
         return 0.0
 
@@ -24,6 +24,16 @@ Error details: {original_error}"""
         super().__init__(self.message)
 
 
+class MCPPoolTimeoutError(MCPError):
+    """No MCP worker became free within the acquire timeout"""
+
+    def __init__(self, timeout: float, queue_depth: int):
+        self.message = f"""🚦 **MCP Server Busy**
+
+All MCP workers stayed busy for {timeout:.0f} seconds ({queue_depth} requests waiting). Please try again in a moment."""
+        super().__init__(self.message)
+
+
 class APICreditsError(MCPError):
     """Anthropic API credits exhausted"""
 
@@ -55,3 +65,23 @@ class APIRateLimitError(MCPError):
 
 Too many requests. Please wait a moment and try again."""
         super().__init__(self.message)
+
+
+class SessionConflictError(Exception):
+    """Another replica already stored a turn with the same session sequence number"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        super().__init__(f"Turn sequence conflict in session {session_id[:8]}")
+
+
+class ToolErrorText(str):
+    """Error text returned in place of a tool result; sent to Claude with is_error"""
+
+
+class ToolErrorContent(list):
+    """Content blocks of a result the MCP tool itself flagged with isError"""
+
+
+def is_tool_error(result) -> bool:
+    return isinstance(result, (ToolErrorText, ToolErrorContent))
@@ -0,0 +1,88 @@
+"""Long-lived background event loop shared across chat sessions"""
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class BackgroundLoop:
+    """Runs a single asyncio event loop in a daemon thread"""
+
+    def __init__(self, name: str = "gala-deck-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Return the running loop, starting the thread on first use"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._start()
+            return self._loop
+
+    def _start(self):
+        ready = threading.Event()
+        loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        self._loop = loop
+        self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+        self._thread.start()
+        ready.wait()
+        logger.debug(f"Background event loop '{self.name}' started")
+
+    def submit(self, coro: Awaitable[Any]) -> concurrent.futures.Future:
+        """Schedule a coroutine on the loop from any thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block until it finishes"""
+        return self.submit(coro).result(timeout)
+
+    async def run_async(self, coro: Awaitable[Any]) -> Any:
+        """Await a coroutine on the loop from whatever loop the caller is on"""
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        if current is self.loop:
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def stop(self):
+        """Stop the loop and join its thread"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5.0)
+        if not loop.is_running():
+            loop.close()
+        logger.debug(f"Background event loop '{self.name}' stopped")
+
+
+_background_loop: Optional[BackgroundLoop] = None
+_background_loop_lock = threading.Lock()
+
+
+def get_background_loop() -> BackgroundLoop:
+    """Return the process-wide background loop"""
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = BackgroundLoop()
+            atexit.register(_background_loop.stop)
+        return _background_loop
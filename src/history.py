@@ -0,0 +1,200 @@
+"""Token-budgeted compaction of the conversation history sent to Claude"""
+import json
+import math
+from typing import List, Dict, Any, Tuple
+
+from .config import HISTORY_TOKEN_BUDGET, HISTORY_KEEP_TOOL_RESULTS_TURNS
+
+import logging
+logger = logging.getLogger(__name__)
+
+ELIDED_TOOL_RESULT = "[tool result elided from history]"
+MISSING_TOOL_RESULT = "[tool call was interrupted; no result was recorded]"
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 1600  # rough cost of an image or document block
+
+
+def _is_tool_result_message(message: Dict[str, Any]) -> bool:
+    content = message.get("content")
+    return (message["role"] == "user" and isinstance(content, list) and
+            any(_block_type(block) == "tool_result" for block in content))
+
+
+def _block_type(block) -> str:
+    return block.get("type") if isinstance(block, dict) else getattr(block, "type", "")
+
+
+def _block_to_dict(block) -> Dict[str, Any]:
+    return block if isinstance(block, dict) else block.model_dump(exclude_none=True)
+
+
+def _missing_tool_results(previous, message) -> List[str]:
+    """ids of ``previous``'s tool_use blocks that ``message`` does not answer"""
+    if (previous is None or previous["role"] != "assistant" or
+            isinstance(previous["content"], str)):
+        return []
+    answered = set()
+    if message is not None and _is_tool_result_message(message):
+        answered = {_block_to_dict(block)["tool_use_id"] for block in message["content"]
+                    if _block_type(block) == "tool_result"}
+    return [_block_to_dict(block)["id"] for block in previous["content"]
+            if _block_type(block) == "tool_use" and _block_to_dict(block)["id"] not in answered]
+
+
+class HistoryManager:
+    """Builds a compacted copy of the history before each API call.
+
+    The caller's list is never modified. A *turn* starts at a user message
+    that is not a tool_result, so whole turns are dropped and every
+    ``tool_use`` keeps its matching ``tool_result``:
+
+    1. tool_result payloads older than the last ``keep_tool_results_turns``
+       turns are replaced by a short placeholder;
+    2. if the estimate is still over ``budget_tokens``, the oldest turns are
+       dropped (never the current one) and replaced by a one-line summary of
+       the questions they contained.
+
+    A ``tool_use`` left without a result (a turn that failed or was cancelled
+    mid-round) gets a placeholder error result, since the API rejects the
+    whole history otherwise.
+    """
+
+    def __init__(self, budget_tokens: int = HISTORY_TOKEN_BUDGET,
+                 keep_tool_results_turns: int = HISTORY_KEEP_TOOL_RESULTS_TURNS):
+        self.budget_tokens = budget_tokens
+        self.keep_tool_results_turns = keep_tool_results_turns
+        # id(message) -> (message, value); holding the message keeps the id valid
+        self._token_cache: Dict[int, Tuple[Dict[str, Any], int]] = {}
+        self._elided_cache: Dict[int, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+
+    def count_tokens(self, message: Dict[str, Any]) -> int:
+        """Estimated tokens for one message, cached per message object"""
+        cached = self._token_cache.get(id(message))
+        if cached is not None and cached[0] is message:
+            return cached[1]
+        tokens = self._estimate(message)
+        self._token_cache[id(message)] = (message, tokens)
+        return tokens
+
+    def total_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        return sum(self.count_tokens(message) for message in messages)
+
+    def compact(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return a copy of ``messages`` that fits the token budget"""
+        self._forget_missing(messages)
+        turns = self._split_turns(self._repair_tool_pairs(messages))
+        if not turns:
+            return list(messages)
+
+        elide_before = len(turns) - self.keep_tool_results_turns
+        turns = [self._elide_tool_results(turn) if i < elide_before else turn
+                 for i, turn in enumerate(turns)]
+
+        turn_tokens = [self.total_tokens(turn) for turn in turns]
+        total = sum(turn_tokens)
+        dropped = 0
+        while total > self.budget_tokens and dropped < len(turns) - 1:
+            total -= turn_tokens[dropped]
+            dropped += 1
+
+        if dropped:
+            logger.info(f"History over budget: dropped {dropped} oldest turns (~{total} tokens kept)")
+            summary = self._summarize(turns[:dropped])
+            turns = turns[dropped:]
+            turns[0] = [self._prepend_text(turns[0][0], summary)] + turns[0][1:]
+
+        return [message for turn in turns for message in turn]
+
+    def _repair_tool_pairs(self, messages):
+        """Copy of ``messages`` where every tool_use is answered by the next message"""
+        repaired = []
+        for message in messages + [None]:
+            missing = _missing_tool_results(repaired[-1] if repaired else None, message)
+            if missing:
+                filler = [{"type": "tool_result", "tool_use_id": tool_id,
+                           "content": MISSING_TOOL_RESULT, "is_error": True}
+                          for tool_id in missing]
+                if message is not None and _is_tool_result_message(message):
+                    message = {**message, "content": filler + list(message["content"])}
+                else:
+                    logger.warning(f"Repairing {len(missing)} tool_use blocks without results")
+                    repaired.append({"role": "user", "content": filler})
+            if message is not None:
+                repaired.append(message)
+        return repaired
+
+    def _split_turns(self, messages):
+        turns = []
+        for message in messages:
+            if not turns or (message["role"] == "user" and not _is_tool_result_message(message)):
+                turns.append([message])
+            else:
+                turns[-1].append(message)
+        return turns
+
+    def _elide_tool_results(self, turn):
+        return [self._elided(message) if _is_tool_result_message(message) else message
+                for message in turn]
+
+    def _elided(self, message):
+        """Placeholder copy of a tool_result message, reused across calls"""
+        cached = self._elided_cache.get(id(message))
+        if cached is not None and cached[0] is message:
+            return cached[1]
+        elided = {**message, "content": [
+            {**_block_to_dict(block), "content": ELIDED_TOOL_RESULT}
+            if _block_type(block) == "tool_result" else block
+            for block in message["content"]
+        ]}
+        self._elided_cache[id(message)] = (message, elided)
+        return elided
+
+    def _summarize(self, turns) -> str:
+        questions = []
+        for turn in turns:
+            text = self._text_of(turn[0]).strip().replace("\n", " ")
+            if text:
+                questions.append(text[:100] + ("…" if len(text) > 100 else ""))
+        listed = "; ".join(f'"{q}"' for q in questions) or "(no text)"
+        return (f"[{len(turns)} earlier turns were removed to save space. "
+                f"The user had asked: {listed}]")
+
+    def _prepend_text(self, message, text):
+        content = message["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        return {**message, "content": [{"type": "text", "text": text}] + list(content)}
+
+    def _text_of(self, message) -> str:
+        content = message.get("content")
+        if isinstance(content, str):
+            return content
+        return " ".join(_block_to_dict(block).get("text", "") for block in content or [])
+
+    def _estimate(self, message) -> int:
+        content = message.get("content")
+        if isinstance(content, str):
+            return math.ceil(len(content) / CHARS_PER_TOKEN) + 4
+        tokens = 4
+        for block in content or []:
+            block = _block_to_dict(block)
+            kind = block.get("type")
+            if kind in ("image", "document"):
+                tokens += IMAGE_TOKENS
+            elif kind == "tool_result" and isinstance(block.get("content"), list):
+                tokens += sum(IMAGE_TOKENS if b.get("type") in ("image", "document")
+                              else math.ceil(len(b.get("text", "")) / CHARS_PER_TOKEN)
+                              for b in block["content"])
+            else:
+                text = block.get("text") or block.get("content") or block.get("input") or ""
+                if not isinstance(text, str):
+                    text = json.dumps(text, default=str)
+                tokens += math.ceil(len(text) / CHARS_PER_TOKEN)
+        return tokens
+
+    def _forget_missing(self, messages):
+        if len(self._token_cache) + len(self._elided_cache) > 4 * len(messages) + 64:
+            live = {id(message) for message in messages}
+            self._elided_cache = {k: v for k, v in self._elided_cache.items() if k in live}
+            live.update(id(elided) for _, elided in self._elided_cache.values())
+            self._token_cache = {k: v for k, v in self._token_cache.items() if k in live}
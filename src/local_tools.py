@@ -0,0 +1,97 @@
+"""Tools answered in-process from the card catalog, without an MCP round-trip"""
+from functools import lru_cache
+from typing import List, Dict, Any, Callable
+
+from assets.catalog import CardRecord, get_catalog
+
+from .errors import ToolErrorText
+from .text_index import BM25Index, tokenize
+
+import logging
+logger = logging.getLogger(__name__)
+
+NAME_WEIGHT = 3
+KEYWORD_WEIGHT = 2
+MAX_RESULTS = 10
+
+TOOL_DEFINITIONS = [
+    {
+        "name": "search_cards",
+        "description": "Search the 78 tarot cards by theme or symbolism, e.g. 'grief', "
+                       "'new beginnings', 'water and emotion'. Returns the best matching cards "
+                       "with their keywords and upright/reversed meanings.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "query": {"type": "string", "description": "Free-text theme or question"},
+                "limit": {"type": "integer", "description": f"Max cards to return (1-{MAX_RESULTS})"},
+            },
+            "required": ["query"],
+        },
+    },
+    {
+        "name": "get_card",
+        "description": "Look up one tarot card by its exact name, e.g. 'The Fool' or 'Three of Swords'.",
+        "input_schema": {
+            "type": "object",
+            "properties": {"name": {"type": "string", "description": "Card name"}},
+            "required": ["name"],
+        },
+    },
+]
+
+
+def format_card(card: CardRecord) -> str:
+    suit = f" of {card.suit}" if card.suit else ""
+    return (f"{card.name} ({card.arcana} arcana{suit}, {card.element})\n"
+            f"Keywords: {', '.join(card.keywords)}\n"
+            f"Upright: {card.meaning_upright}\n"
+            f"Reversed: {card.meaning_reversed}")
+
+
+@lru_cache(maxsize=1)
+def card_index() -> BM25Index:
+    """BM25 index over the catalog, built on first use"""
+    return BM25Index(
+        tokenize(card.name) * NAME_WEIGHT +
+        tokenize(" ".join(card.keywords)) * KEYWORD_WEIGHT +
+        tokenize(" ".join(filter(None, (card.symbolism, card.meaning_upright, card.meaning_reversed))))
+        for card in get_catalog())
+
+
+def search_cards(query: str, limit: int = 5) -> str:
+    cards = get_catalog().cards
+    hits = card_index().top(query, max(1, min(int(limit), MAX_RESULTS)))
+    if not hits:
+        return f"No cards match {query!r}."
+    return "\n\n".join(format_card(cards[i]) for i, _ in hits)
+
+
+def get_card(name: str) -> str:
+    card = get_catalog().by_name(name)
+    if card is None:
+        return f"No card named {name!r}."
+    return format_card(card)
+
+
+TOOLS: Dict[str, Callable[..., str]] = {
+    "search_cards": search_cards,
+    "get_card": get_card,
+}
+
+
+def tool_definitions() -> List[Dict[str, Any]]:
+    return TOOL_DEFINITIONS
+
+
+def is_local_tool(name: str) -> bool:
+    return name in TOOLS
+
+
+def call_local_tool(name: str, arguments: Dict[str, Any]) -> str:
+    """Run a local tool; bad arguments come back as text for Claude to correct"""
+    try:
+        return TOOLS[name](**(arguments or {}))
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Local tool {name} called with bad arguments {arguments}: {e}")
+        return ToolErrorText(f"Error calling {name}: {e}")
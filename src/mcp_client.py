@@ -1,27 +1,96 @@
 """MCP client wrapper for tool management"""
 from datetime import datetime
-from .errors import MCPConnectionError
-from .config import MCP_SERVER_COMMAND, MCP_SERVER_PATH
+from .errors import MCPConnectionError, ToolErrorContent, ToolErrorText
+from .config import MCP_SERVER_COMMAND, MCP_SERVER_PATH, TOOL_RESULT_MAX_CHARS
+from .tool_cache import ToolResultCache, get_tool_cache
+from .tracing import span
 import asyncio
 import os
 import subprocess
-from typing import List, Dict, Any
+import json
+from typing import List, Dict, Any, Optional, Union
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import StdioServerParameters as StdioParams
 from mcp.client.stdio import get_default_environment, stdio_client
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, AsyncExitStack
 
 import logging
 logger = logging.getLogger(__name__)
 
+# Content of a tool_result block: a plain error string or Anthropic content blocks
+ToolContent = Union[str, List[Dict[str, Any]]]
+
+IMAGE_MEDIA_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp"}
+
+
+def to_anthropic_content(content, max_chars: int = TOOL_RESULT_MAX_CHARS) -> List[Dict[str, Any]]:
+    """Convert MCP content blocks into Anthropic tool_result content blocks.
+
+    Text is passed through raw, images and PDF resources become base64
+    blocks, and anything else is described in a short text block. Text past
+    ``max_chars`` (summed over all blocks) is truncated.
+    """
+    blocks = []
+    for item in content:
+        kind = getattr(item, "type", None)
+        if kind == "text":
+            blocks.append({"type": "text", "text": item.text})
+        elif kind == "image" and item.mimeType in IMAGE_MEDIA_TYPES:
+            blocks.append({"type": "image", "source": {
+                "type": "base64", "media_type": item.mimeType, "data": item.data}})
+        elif kind == "resource":
+            resource = item.resource
+            if getattr(resource, "text", None) is not None:
+                blocks.append({"type": "text", "text": f"[{resource.uri}]\n{resource.text}"})
+            elif resource.mimeType == "application/pdf":
+                blocks.append({"type": "document", "source": {
+                    "type": "base64", "media_type": "application/pdf", "data": resource.blob}})
+            else:
+                blocks.append({"type": "text", "text": f"[binary resource {resource.uri} ({resource.mimeType}) omitted]"})
+        elif kind == "resource_link":
+            blocks.append({"type": "text", "text": f"[resource {item.name}: {item.uri}]"})
+        else:
+            blocks.append({"type": "text", "text": f"[unsupported {kind} content omitted]"})
+    return _truncate_text(blocks, max_chars)
+
+
+def _truncate_text(blocks, max_chars):
+    remaining = max_chars
+    kept = []
+    for block in blocks:
+        if block["type"] != "text":
+            kept.append(block)
+            continue
+        text = block["text"]
+        if remaining <= 0:
+            continue
+        if len(text) > remaining:
+            omitted = len(text) - remaining
+            text = f"{text[:remaining]}\n…[truncated {omitted} characters]"
+        remaining -= len(block["text"])
+        kept.append({"type": "text", "text": text})
+    dropped = sum(1 for b in blocks if b["type"] == "text") - sum(1 for b in kept if b["type"] == "text")
+    if dropped:
+        kept.append({"type": "text", "text": f"…[{dropped} more text blocks truncated]"})
+    return kept
+
+
+def content_preview(content: ToolContent, limit: int = 500) -> str:
+    """Short plain-text view of tool content for logs and history"""
+    if isinstance(content, str):
+        return content[:limit]
+    return " ".join(block.get("text", f"<{block['type']}>") for block in content)[:limit]
+
 
 class MCPClient:
     """Manages MCP server connection and tool retrieval"""
 
-    def __init__(self):
-        self.command = MCP_SERVER_COMMAND
-        self.args = [MCP_SERVER_PATH]
+    def __init__(self, cache: Optional[ToolResultCache] = None,
+                 command: Optional[str] = None, args: Optional[List[str]] = None):
+        self.command = command or MCP_SERVER_COMMAND
+        self.args = args if args is not None else [MCP_SERVER_PATH]
         self.tool_call_history = []
+        self.cache = cache if cache is not None else get_tool_cache()
 
     @asynccontextmanager
     async def get_tools_and_session(self):
@@ -39,18 +108,32 @@ class MCPClient:
             logger.error(f"Error in get_tools_and_session: {e}", exc_info=True)
             raise MCPConnectionError(MCP_SERVER_PATH, str(e))
 
+    @asynccontextmanager
+    async def open_session(self):
+        """Start the MCP server and yield an initialized session and its tools"""
+        async with AsyncExitStack() as stack:
+            with span("mcp.spawn"):
+                read, write = await stack.enter_async_context(self.get_tools_and_session())
+                session = await stack.enter_async_context(ClientSession(read, write))
+            tools = await self._initialize(session)
+            yield session, tools
+
     async def initialize_session(self, read, write):
         """Initialize a session and return tools"""
-        try:
-            logger.info("Creating ClientSession...")
-            session = ClientSession(read, write)
+        session = ClientSession(read, write)
+        return session, await self._initialize(session)
 
+    async def _initialize(self, session):
+        """Run the MCP handshake and return tools in Anthropic format"""
+        try:
             logger.info("Calling session.initialize()...")
-            await asyncio.wait_for(session.initialize(), timeout=60.0)
+            with span("mcp.initialize"):
+                await asyncio.wait_for(session.initialize(), timeout=60.0)
             logger.info("Session initialized successfully!")
 
             logger.info("Calling session.list_tools()...")
-            tools_result = await asyncio.wait_for(session.list_tools(), timeout=10.0)
+            with span("mcp.list_tools"):
+                tools_result = await asyncio.wait_for(session.list_tools(), timeout=10.0)
             logger.info(f"Got {len(tools_result.tools)} tools")
 
             logger.info(
@@ -66,7 +149,7 @@ class MCPClient:
                 })
 
             logger.info("Returning session and tools")
-            return session, anthropic_tools
+            return anthropic_tools
 
         except asyncio.TimeoutError:
             logger.error("Timeout during MCP initialization")
@@ -76,37 +159,61 @@ class MCPClient:
             logger.error(f"Error initializing MCP session: {e}", exc_info=True)
             raise MCPConnectionError(MCP_SERVER_PATH, str(e))
 
-    async def call_tool(self, session, tool_name: str, arguments: Dict[str, Any]) -> str:
-        """Execute a tool call on the MCP server and return string content"""
+    async def call_tool(self, session, tool_name: str, arguments: Dict[str, Any]) -> ToolContent:
+        """Execute a tool call on the MCP server and return tool_result content"""
+        try:
+            return await self.execute_tool(session, tool_name, arguments)
+        except Exception as e:
+            return self.tool_error(tool_name, e)
+
+    async def execute_tool(self, session, tool_name: str, arguments: Dict[str, Any]) -> ToolContent:
+        """Execute a tool call, raising on timeout or transport failure"""
         logger.info(f"🔧 Calling tool: {tool_name}")
         logger.info(f"   Arguments: {arguments}")
 
-        try:
+        with span("mcp.call_tool", tool=tool_name) as record:
+            cached = self.cache.get(tool_name, arguments)
+            record["cached"] = cached is not None
+            if cached is not None:
+                logger.info("   Served from tool result cache")
+                self._record_call(tool_name, arguments, cached, cached=True)
+                return cached
+
             result = await asyncio.wait_for(
                 session.call_tool(tool_name, arguments=arguments),
                 timeout=30.0
             )
 
-            result_str = str(result.content) if hasattr(
-                result, 'content') else str(result)
-
-            call_record = {
-                "timestamp": datetime.now().isoformat(),
-                "tool": tool_name,
-                "arguments": arguments,
-                "result": result_str[:500]
-            }
-            self.tool_call_history.append(call_record)
-
-            logger.info(f"   Result preview: {result_str[:100]}...")
-
-            return result_str
-
-        except asyncio.TimeoutError:
+        content = to_anthropic_content(result.content)
+        if not content and result.structuredContent is not None:
+            content = _truncate_text(
+                [{"type": "text", "text": json.dumps(result.structuredContent)}], TOOL_RESULT_MAX_CHARS)
+
+        # Tool-level errors come back as results; never cache them
+        if result.isError:
+            content = ToolErrorContent(content)
+        else:
+            self.cache.put(tool_name, arguments, content)
+
+        self._record_call(tool_name, arguments, content)
+        logger.info(f"   Result preview: {content_preview(content, 100)}...")
+
+        return content
+
+    def _record_call(self, tool_name, arguments, content, cached=False):
+        self.tool_call_history.append({
+            "timestamp": datetime.now().isoformat(),
+            "tool": tool_name,
+            "arguments": arguments,
+            "result": content_preview(content),
+            "cached": cached,
+        })
+
+    def tool_error(self, tool_name: str, error: Exception) -> ToolErrorText:
+        """Log a failed tool call and return the error text sent to Claude"""
+        if isinstance(error, asyncio.TimeoutError):
             error_msg = f"Tool call '{tool_name}' timed out after 30 seconds"
-            logger.error(error_msg)
-            return f"Error: {error_msg}"
-        except Exception as e:
-            error_msg = f"Tool call '{tool_name}' failed: {str(e)}"
-            logger.error(error_msg)
-            return f"Error: {error_msg}"
+        else:
+            error_msg = f"Tool call '{tool_name}' failed: {str(error)}"
+        logger.error(error_msg)
+        return ToolErrorText(f"Error: {error_msg}")
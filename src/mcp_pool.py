@@ -0,0 +1,156 @@
+"""Process-wide pool of warm MCP server workers"""
+import asyncio
+import atexit
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Callable
+
+from .config import MCP_POOL_SIZE, MCP_POOL_MIN_SIZE, MCP_POOL_ACQUIRE_TIMEOUT
+from .errors import MCPPoolTimeoutError
+from .event_loop import BackgroundLoop, get_background_loop
+from .tracing import span
+
+if TYPE_CHECKING:  # the mcp SDK is imported when the first worker is created
+    from .mcp_client import MCPClient
+    from .mcp_session import MCPSessionManager
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class MCPSessionPool:
+    """Bounded set of MCPSessionManager workers shared by every chat session.
+
+    Workers are created on demand up to ``max_size``. When all of them are
+    busy, callers queue until one is released or ``acquire_timeout`` expires.
+    All pool state lives on the background loop, so any thread may use it.
+    """
+
+    def __init__(self, max_size: int = MCP_POOL_SIZE,
+                 acquire_timeout: float = MCP_POOL_ACQUIRE_TIMEOUT,
+                 min_size: int = MCP_POOL_MIN_SIZE,
+                 client_factory: Optional[Callable[[], "MCPClient"]] = None,
+                 background_loop: Optional[BackgroundLoop] = None):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.min_size = min(min_size, max_size)
+        self.acquire_timeout = acquire_timeout
+        self._client_factory = client_factory
+        self._background = background_loop or get_background_loop()
+        self._workers: List["MCPSessionManager"] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._tools: Optional[List[Dict[str, Any]]] = None
+        self._waiting = 0
+        self._acquire_count = 0
+        self._timeout_count = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of callers currently waiting for a worker"""
+        return self._waiting
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool sizing metrics"""
+        idle = self._idle.qsize() if self._idle is not None else 0
+        return {
+            "max_size": self.max_size,
+            "workers": len(self._workers),
+            "in_use": len(self._workers) - idle,
+            "idle": idle,
+            "queue_depth": self._waiting,
+            "acquires": self._acquire_count,
+            "timeouts": self._timeout_count,
+            "avg_wait_ms": (self._wait_total / self._acquire_count * 1000) if self._acquire_count else 0.0,
+            "max_wait_ms": self._wait_max * 1000,
+        }
+
+    async def get_tools(self) -> List[Dict[str, Any]]:
+        """Return the tool list, fetched once from the first worker"""
+        if self._tools is None:
+            async with self.acquire() as worker:
+                self._tools = await worker.get_tools()
+        return self._tools
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
+        """Run one tool call on whichever worker is free"""
+        async with self.acquire() as worker:
+            return await worker.call_tool(tool_name, arguments)
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Check out a worker for the duration of the block"""
+        with span("mcp.pool_wait"):
+            worker = await self._background.run_async(self._acquire())
+        idle = self._idle
+        try:
+            yield worker
+        finally:
+            self._background.loop.call_soon_threadsafe(idle.put_nowait, worker)
+
+    async def warm(self):
+        """Start ``min_size`` workers ahead of the first request"""
+        await self._background.run_async(self._warm())
+
+    def close(self):
+        """Shut down every worker's server process"""
+        for worker in self._workers:
+            worker.close()
+        self._workers = []
+        self._idle = None
+        self._tools = None
+
+    async def _acquire(self) -> "MCPSessionManager":
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+        started = time.monotonic()
+        if self._idle.empty() and len(self._workers) < self.max_size:
+            worker = self._new_worker()
+        else:
+            self._waiting += 1
+            try:
+                worker = await asyncio.wait_for(self._idle.get(), self.acquire_timeout)
+            except asyncio.TimeoutError:
+                self._timeout_count += 1
+                logger.warning(f"MCP pool acquire timed out: {self.stats()}")
+                raise MCPPoolTimeoutError(self.acquire_timeout, self._waiting)
+            finally:
+                self._waiting -= 1
+        waited = time.monotonic() - started
+        self._acquire_count += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        return worker
+
+    async def _warm(self):
+        if self._idle is None:
+            self._idle = asyncio.Queue()
+        while len(self._workers) < self.min_size:
+            worker = self._new_worker()
+            self._idle.put_nowait(worker)
+        await asyncio.gather(*(worker.start() for worker in self._workers))
+
+    def _new_worker(self) -> "MCPSessionManager":
+        from .mcp_client import MCPClient
+        from .mcp_session import MCPSessionManager
+        worker = MCPSessionManager((self._client_factory or MCPClient)(), self._background)
+        self._workers.append(worker)
+        logger.info(f"Created MCP worker {len(self._workers)}/{self.max_size}")
+        return worker
+
+
+_pool: Optional[MCPSessionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_mcp_pool() -> MCPSessionPool:
+    """Return the process-wide MCP worker pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = MCPSessionPool()
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,147 @@
+"""Persistent MCP server session reused across chat turns"""
+import asyncio
+from typing import List, Dict, Any, Optional
+
+import anyio
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+
+from .event_loop import BackgroundLoop, get_background_loop
+from .mcp_client import MCPClient
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Errors meaning the server process or its stdio pipes are gone
+DISCONNECT_ERRORS = (
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    BrokenPipeError,
+    ConnectionError,
+)
+
+
+def _is_disconnect(error: Exception) -> bool:
+    if isinstance(error, McpError):
+        return error.error.code == CONNECTION_CLOSED
+    return isinstance(error, DISCONNECT_ERRORS)
+
+
+class MCPSessionManager:
+    """Starts the MCP server once and keeps its ClientSession alive.
+
+    The server and session live on the shared background loop, so they
+    survive the per-call event loops of the Streamlit threads. A dead
+    server is restarted transparently on the next call.
+    """
+
+    def __init__(self, mcp_client: Optional[MCPClient] = None,
+                 background_loop: Optional[BackgroundLoop] = None):
+        self.client = mcp_client or MCPClient()
+        self._background = background_loop or get_background_loop()
+        self._session = None
+        self._tools: List[Dict[str, Any]] = []
+        self._runner: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Future] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self.restart_count = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._session is not None and self._runner is not None and not self._runner.done()
+
+    async def get_tools(self) -> List[Dict[str, Any]]:
+        """Return the server's tools in Anthropic format"""
+        return await self._background.run_async(self._get_tools())
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
+        """Call a tool on the persistent session, reconnecting once if needed"""
+        return await self._background.run_async(self._call_tool(tool_name, arguments))
+
+    async def start(self):
+        """Start the server ahead of the first request"""
+        await self._background.run_async(self._ensure_started())
+
+    def close(self):
+        """Shut down the server process; safe to call more than once"""
+        if self._runner is None:
+            return
+        try:
+            self._background.run(self._shutdown(), timeout=10.0)
+        except Exception as e:
+            logger.warning(f"Error shutting down MCP server: {e}")
+
+    async def _get_tools(self):
+        await self._ensure_started()
+        return self._tools
+
+    async def _call_tool(self, tool_name, arguments):
+        for attempt in range(2):
+            session = await self._ensure_started()
+            try:
+                return await self.client.execute_tool(session, tool_name, arguments)
+            except Exception as e:
+                if attempt == 0 and _is_disconnect(e):
+                    logger.warning(f"MCP server connection lost ({e!r}), restarting")
+                    await self._restart(session)
+                    continue
+                return self.client.tool_error(tool_name, e)
+
+    async def _ensure_started(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._runner is None or self._runner.done():
+                self._ready = asyncio.get_running_loop().create_future()
+                self._stop = asyncio.Event()
+                self._runner = asyncio.create_task(
+                    self._run_server(self._ready, self._stop))
+            await asyncio.shield(self._ready)
+            return self._session
+
+    async def _run_server(self, ready: asyncio.Future, stop: asyncio.Event):
+        """Own the stdio connection for its whole lifetime (enter and exit in one task)"""
+        try:
+            async with self.client.open_session() as (session, tools):
+                self._session, self._tools = session, tools
+                logger.info("🔌 MCP server session started")
+                ready.set_result(None)
+                await stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning(f"MCP server session ended: {e}")
+        finally:
+            self._session = None
+            if not ready.done():
+                ready.set_exception(RuntimeError("MCP server stopped"))
+
+    async def _restart(self, dead_session):
+        async with self._lock:
+            if self._session is not dead_session:
+                return  # someone else already restarted it
+            await self._stop_runner()
+            self.restart_count += 1
+
+    async def _stop_runner(self):
+        runner, stop = self._runner, self._stop
+        if runner is None:
+            return
+        stop.set()
+        try:
+            await asyncio.wait_for(runner, timeout=5.0)
+        except Exception as e:
+            logger.debug(f"MCP runner exited with {e!r}")
+        self._runner = None
+        self._session = None
+
+    async def _shutdown(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            await self._stop_runner()
+        logger.info("MCP server session closed")
+
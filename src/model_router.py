@@ -0,0 +1,46 @@
+"""Per-request model choice between the default model and a faster, cheaper one"""
+from typing import Tuple
+
+from .config import (MODEL_NAME, FAST_MODEL_NAME, ROUTE_SHORT_PROMPT_CHARS,
+                     ROUTE_TOOL_CONTINUATIONS, SESSION_BUDGET_USD)
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ModelRouter:
+    """Picks the model for one Claude request from simple, ordered rules.
+
+    1. no fast model configured -> default model;
+    2. session spend at or over ``session_budget`` -> fast model;
+    3. tool-loop continuation (the request after tool results) -> fast model,
+       if ``route_continuations``;
+    4. turn's question shorter than ``short_prompt_chars`` -> fast model;
+    5. otherwise the default model.
+
+    Prompt caches are per model, so routing continuations trades cache reads
+    for a faster model; the per-model stats show which way that goes.
+    """
+
+    def __init__(self, default_model: str = MODEL_NAME, fast_model: str = FAST_MODEL_NAME,
+                 short_prompt_chars: int = ROUTE_SHORT_PROMPT_CHARS,
+                 route_continuations: bool = ROUTE_TOOL_CONTINUATIONS,
+                 session_budget: float = SESSION_BUDGET_USD):
+        self.default_model = default_model
+        self.fast_model = fast_model
+        self.short_prompt_chars = short_prompt_chars
+        self.route_continuations = route_continuations
+        self.session_budget = session_budget
+
+    def choose(self, question: str, continuation: bool = False,
+               session_cost: float = 0.0) -> Tuple[str, str]:
+        """Return ``(model, reason)`` for the next request"""
+        if not self.fast_model:
+            return self.default_model, "default"
+        if self.session_budget > 0 and session_cost >= self.session_budget:
+            return self.fast_model, "budget"
+        if continuation and self.route_continuations:
+            return self.fast_model, "continuation"
+        if len(question.strip()) < self.short_prompt_chars:
+            return self.fast_model, "short_prompt"
+        return self.default_model, "default"
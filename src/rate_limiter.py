@@ -0,0 +1,173 @@
+"""Client-side rate limiting and retry scheduling for Claude API calls"""
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+from .config import (CLAUDE_RPM, CLAUDE_ITPM, CLAUDE_MAX_IN_FLIGHT, CLAUDE_MAX_RETRIES,
+                     CLAUDE_RETRY_BASE_DELAY, CLAUDE_RETRY_MAX_DELAY)
+from .errors import APIAuthError, APIRateLimitError
+
+import logging
+logger = logging.getLogger(__name__)
+
+OVERLOADED_STATUS = 529
+
+
+class TokenBucket:
+    """Continuously refilling bucket of ``per_minute`` units (0 = unlimited).
+
+    The balance may go negative when actual usage exceeds an estimate; later
+    callers then wait for the debt to be refilled.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self._tokens = per_minute
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1) -> float:
+        """Wait until ``amount`` is available, take it and return the time waited"""
+        if self.capacity <= 0:
+            return 0.0
+        amount = min(amount, self.capacity)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        waited = 0.0
+        async with self._lock:  # FIFO: one waiter refills at a time
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+    def adjust(self, amount: float):
+        """Charge (or refund, if negative) the difference from an estimate"""
+        if self.capacity <= 0:
+            return
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - amount)
+
+
+class RateLimiter:
+    """Shared limiter for all Claude calls in the process.
+
+    ``request()`` queues for an in-flight slot and the request/token budgets;
+    ``retry_delay()`` turns a retryable error into a jittered backoff that
+    honors ``retry-after``, or raises the app's error once retries run out.
+    """
+
+    def __init__(self, requests_per_minute: float = CLAUDE_RPM,
+                 input_tokens_per_minute: float = CLAUDE_ITPM,
+                 max_in_flight: int = CLAUDE_MAX_IN_FLIGHT,
+                 max_retries: int = CLAUDE_MAX_RETRIES,
+                 base_delay: float = CLAUDE_RETRY_BASE_DELAY,
+                 max_delay: float = CLAUDE_RETRY_MAX_DELAY):
+        self.requests = TokenBucket(requests_per_minute)
+        self.input_tokens = TokenBucket(input_tokens_per_minute)
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.queued = 0
+        self.retries = 0
+        self.throttled_s = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "retries": self.retries,
+            "throttled_s": round(self.throttled_s, 3),
+        }
+
+    @asynccontextmanager
+    async def request(self, estimated_input_tokens: int = 0):
+        """Hold an in-flight slot and budget for one API request"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+        self.queued += 1
+        started = time.monotonic()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        try:
+            await self.requests.acquire(1)
+            await self.input_tokens.acquire(estimated_input_tokens)
+            self.throttled_s += time.monotonic() - started
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+        finally:
+            self._slots.release()
+
+    def record_usage(self, estimated_input_tokens: int, actual_input_tokens: int):
+        """Correct the token bucket once the real input size is known"""
+        self.input_tokens.adjust(actual_input_tokens - estimated_input_tokens)
+
+    def retry_delay(self, error: Exception, attempt: int) -> float:
+        """Seconds to wait before retrying ``error``; raises if it should not be retried"""
+        # Imported here so the app can load this module without the SDK
+        from anthropic import (APIConnectionError, APIStatusError, AuthenticationError,
+                               InternalServerError, RateLimitError)
+        if isinstance(error, AuthenticationError):
+            raise APIAuthError() from error
+        retryable = isinstance(error, (RateLimitError, InternalServerError, APIConnectionError)) or (
+            isinstance(error, APIStatusError) and error.status_code == OVERLOADED_STATUS)
+        if not retryable:
+            raise error
+        if attempt >= self.max_retries:
+            # Only quota and overload errors are "rate limits"; a 5xx outage stays itself
+            if isinstance(error, RateLimitError) or (
+                    isinstance(error, APIStatusError) and error.status_code == OVERLOADED_STATUS):
+                raise APIRateLimitError() from error
+            raise error
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = self._retry_after(error)
+        if retry_after is not None:
+            delay = min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        self.retries += 1
+        logger.warning(f"Claude API {type(error).__name__}, retry {attempt + 1}/{self.max_retries} "
+                       f"in {delay:.1f}s")
+        return delay
+
+    @staticmethod
+    def _retry_after(error) -> Optional[float]:
+        response = getattr(error, "response", None)
+        if response is None:
+            return None
+        try:
+            return max(0.0, float(response.headers.get("retry-after")))
+        except (TypeError, ValueError):
+            return None
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide Claude rate limiter"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
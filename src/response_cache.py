@@ -0,0 +1,153 @@
+"""Persistent exact-match cache of final answers for repeated conversations"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+from .config import RESPONSE_CACHE_PATH, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def _normalize_block(block) -> Any:
+    block = block if isinstance(block, dict) else block.model_dump(exclude_none=True)
+    block = {k: v for k, v in block.items() if k != "cache_control"}
+    if block.get("type") == "text":
+        return _normalize_text(block["text"])
+    return block
+
+
+def _normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class ResponseCache:
+    """SQLite-backed map from (model, normalized conversation) to the final answer.
+
+    Text is whitespace-normalized before hashing so trivially different
+    prompts share an entry. Entries expire after ``ttl`` seconds and the
+    least recently used are evicted beyond ``max_entries``. With no
+    ``path`` the cache is disabled.
+    """
+
+    def __init__(self, path: Optional[str] = RESPONSE_CACHE_PATH,
+                 ttl: float = RESPONSE_CACHE_TTL,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._puts_since_prune = 0
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved_ms = 0.0
+        if path and ttl > 0:
+            self._open_db(path)
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    @staticmethod
+    def make_key(messages: List[Dict[str, Any]], model: str) -> str:
+        normalized = [
+            {"role": message["role"],
+             "content": [_normalize_text(message["content"])] if isinstance(message["content"], str)
+             else [_normalize_block(block) for block in message["content"]]}
+            for message in messages
+        ]
+        canonical = json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(f"{model}\0{canonical}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return ``{"text", "latency_ms"}`` for a live entry, or None"""
+        if self._db is None:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT text, latency_ms FROM response_cache WHERE key = ? AND expires_at > ?",
+                (key, now)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE response_cache SET used_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            return {"text": row[0], "latency_ms": row[1]}
+
+    def put(self, key: str, model: str, text: str, latency_ms: float):
+        """Store a complete answer and how long it originally took"""
+        if self._db is None:
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, text, latency_ms, now + self.ttl, now))
+                self._puts_since_prune += 1
+                if self._puts_since_prune >= 50:
+                    self._prune()
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not store cached response: {e}")
+
+    def record_hit(self, original_ms: float, served_ms: float) -> float:
+        """Add the time a hit saved over the original turn to the stats and return it"""
+        saved = round(max(0.0, original_ms - served_ms), 2)
+        self.latency_saved_ms += saved
+        return saved
+
+    def clear(self):
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute("DELETE FROM response_cache")
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "latency_saved_ms": round(self.latency_saved_ms, 2),
+        }
+
+    def _open_db(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, text TEXT NOT NULL, "
+            "latency_ms REAL NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL)")
+        self._prune()
+        self._db.commit()
+
+    def _prune(self):
+        self._puts_since_prune = 0
+        self._db.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+        self._db.execute(
+            "DELETE FROM response_cache WHERE key NOT IN ("
+            "SELECT key FROM response_cache ORDER BY used_at DESC LIMIT ?)",
+            (self.max_entries,))
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
@@ -0,0 +1,442 @@
+"""Chat history and usage totals kept outside the Streamlit process"""
+import atexit
+import copy
+import json
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
+
+from .config import (
+    SESSION_STORE, SESSION_CACHE_SIZE, SESSION_FLUSH_BATCH, SESSION_FLUSH_INTERVAL,
+    SESSION_FLUSH_MAX_ATTEMPTS, SESSION_MAX_PENDING
+)
+from .errors import SessionConflictError
+
+import logging
+logger = logging.getLogger(__name__)
+
+_SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def new_usage() -> Dict[str, Any]:
+    """Zeroed session totals, as shown in the sidebar"""
+    return {
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cache_creation_input_tokens": 0,
+        "cache_read_input_tokens": 0,
+        "total_cost": 0.0,
+        "request_count": 0,
+        "stopped_turns": 0,
+        "tool_schema_tokens_saved": 0,
+        "by_model": {},
+    }
+
+
+def _rebase_usage(usage: Dict[str, Any], old_base: Dict[str, Any],
+                  new_base: Dict[str, Any]) -> Dict[str, Any]:
+    """Totals ``usage`` re-counted from ``new_base`` instead of ``old_base``.
+
+    A turn's own cost is ``usage - old_base``; nested dicts (``by_model``) are
+    rebased key by key and non-numeric values are kept as they are.
+    """
+    rebased = {}
+    for key in list(usage) + [key for key in new_base if key not in usage]:
+        value, old, new = usage.get(key), old_base.get(key), new_base.get(key)
+        if isinstance(value, dict) or isinstance(new, dict):
+            rebased[key] = _rebase_usage(value or {}, old or {}, new or {})
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            rebased[key] = (new or 0) + value - (old or 0)
+        else:
+            rebased[key] = value if key in usage else new
+    return rebased
+
+
+def _to_json(message: Dict[str, Any]) -> Dict[str, Any]:
+    content = message["content"]
+    if not isinstance(content, str):
+        content = [block if isinstance(block, dict) else block.model_dump(exclude_none=True)
+                   for block in content]
+    # Round trip so the stored copy shares nothing with the live history
+    return json.loads(json.dumps({**message, "content": content}, default=str))
+
+
+class TurnRecord(NamedTuple):
+    """Append-only unit of storage: what one turn added to a session"""
+    seq: int
+    messages: List[Dict[str, Any]]  # messages appended since the previous record
+    usage: Dict[str, Any]  # session totals after the turn
+
+
+class InMemorySessionBackend:
+    """Records kept in this process; for development and tests (one replica only)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records: Dict[str, List[TurnRecord]] = {}
+
+    def write(self, records: List[Tuple[str, TurnRecord]]):
+        """All-or-nothing, like one SQL transaction"""
+        with self._lock:
+            batch = set()
+            for session_id, record in records:
+                stored = self._records.get(session_id, [])
+                if (session_id, record.seq) in batch or any(r.seq == record.seq for r in stored):
+                    raise SessionConflictError(session_id)
+                batch.add((session_id, record.seq))
+            for session_id, record in records:
+                self._records.setdefault(session_id, []).append(record)
+
+    def read(self, session_id: str, since_seq: int = 0) -> List[TurnRecord]:
+        with self._lock:
+            return [copy.deepcopy(record) for record in self._records.get(session_id, [])
+                    if record.seq >= since_seq]
+
+    def latest(self, session_id: str) -> Optional[TurnRecord]:
+        with self._lock:
+            records = self._records.get(session_id)
+            return copy.deepcopy(records[-1]) if records else None
+
+
+class SQLSessionBackend:
+    """Records in the ``chat_turns`` table of the assets/database.py database.
+
+    Each write is one multi-row INSERT; rows are never updated. Replicas
+    share the table through its ``(session_id, seq)`` primary key: a turn
+    number taken by another replica raises SessionConflictError.
+    """
+
+    def __init__(self, bind=None):
+        from sqlalchemy import JSON, Column, DateTime, Integer, MetaData, String, Table
+        if bind is None:
+            from assets.database import engine as bind
+        self.engine = bind
+        self.table = Table(
+            "chat_turns", MetaData(),
+            Column("session_id", String(32), primary_key=True),
+            Column("seq", Integer, primary_key=True, autoincrement=False),
+            Column("messages", JSON, nullable=False),
+            Column("usage", JSON, nullable=False),
+            Column("created_at", DateTime, default=datetime.utcnow),
+        )
+        self.table.create(bind, checkfirst=True)
+
+    def write(self, records: List[Tuple[str, TurnRecord]]):
+        from sqlalchemy.exc import IntegrityError
+        rows = [{"session_id": session_id, "seq": record.seq,
+                 "messages": record.messages, "usage": record.usage}
+                for session_id, record in records]
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(self.table.insert(), rows)
+        except IntegrityError as e:
+            raise SessionConflictError(records[0][0]) from e
+
+    def read(self, session_id: str, since_seq: int = 0) -> List[TurnRecord]:
+        from sqlalchemy import select
+        table = self.table
+        query = (select(table.c.seq, table.c.messages, table.c.usage)
+                 .where(table.c.session_id == session_id, table.c.seq >= since_seq)
+                 .order_by(table.c.seq))
+        with self.engine.connect() as conn:
+            return [TurnRecord(*row) for row in conn.execute(query)]
+
+    def latest(self, session_id: str) -> Optional[TurnRecord]:
+        from sqlalchemy import select
+        table = self.table
+        query = (select(table.c.seq, table.c.messages, table.c.usage)
+                 .where(table.c.session_id == session_id)
+                 .order_by(table.c.seq.desc()).limit(1))
+        with self.engine.connect() as conn:
+            row = conn.execute(query).first()
+        return TurnRecord(*row) if row else None
+
+
+class ChatSession:
+    """One conversation's ``messages`` and ``total_usage``.
+
+    Both are plain mutable objects, used exactly like the old
+    ``st.session_state`` entries; ``commit()`` appends whatever changed since
+    the last commit as one record. The history is read from the backend on
+    first access to ``messages``.
+    """
+
+    def __init__(self, store: "SessionStore", session_id: str, latest: Optional[TurnRecord]):
+        self.store = store
+        self.session_id = session_id
+        self.next_seq = latest.seq + 1 if latest else 0
+        self.total_usage = copy.deepcopy(latest.usage) if latest else new_usage()
+        self._committed_usage = copy.deepcopy(self.total_usage)
+        self._messages: Optional[List[Dict[str, Any]]] = None
+        self._committed = 0  # messages already recorded
+
+    @property
+    def loaded(self) -> bool:
+        return self._messages is not None
+
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        if self._messages is None:
+            records = self.store.read(self.session_id, until_seq=self.next_seq)
+            self._messages = [message for record in records for message in record.messages]
+            self._committed = len(self._messages)
+        return self._messages
+
+    def commit(self):
+        """Record new messages and the current totals; a no-op when nothing changed"""
+        new_messages = self._messages[self._committed:] if self._messages is not None else []
+        if not new_messages and self.total_usage == self._committed_usage:
+            return
+        record = TurnRecord(self.next_seq, [_to_json(message) for message in new_messages],
+                            json.loads(json.dumps(self.total_usage)))
+        self.next_seq += 1
+        self._committed += len(new_messages)
+        self._committed_usage = copy.deepcopy(self.total_usage)
+        self.store.append(self.session_id, record)
+
+    def reset_usage(self):
+        self.total_usage = new_usage()
+        self.commit()
+
+    def apply(self, records: List[TurnRecord]):
+        """Catch up with records another replica wrote after this one loaded"""
+        for record in records:
+            if record.seq < self.next_seq:
+                continue
+            if self._messages is not None:
+                self._messages.extend(record.messages)
+                self._committed = len(self._messages)
+            self.total_usage = record.usage
+            self._committed_usage = copy.deepcopy(record.usage)
+            self.next_seq = record.seq + 1
+
+
+class SessionStore:
+    """Process-wide front for a session backend.
+
+    Recently used sessions stay in memory, up to ``max_sessions`` (least
+    recently used are dropped and reloaded on demand). Committed turns are
+    queued and written in batches: as soon as ``flush_batch`` records are
+    waiting, or at most ``flush_interval`` seconds after the first one.
+
+    When a batch fails, each session is retried on its own, so one session
+    cannot block the others. A session whose turn numbers were taken by
+    another replica has its records renumbered after the stored ones.
+    Other failures are retried up to ``max_attempts`` times. At most
+    ``max_pending`` records are queued; beyond that the oldest are dropped.
+    """
+
+    def __init__(self, backend=None, max_sessions: int = SESSION_CACHE_SIZE,
+                 flush_batch: int = SESSION_FLUSH_BATCH,
+                 flush_interval: float = SESSION_FLUSH_INTERVAL,
+                 max_attempts: int = SESSION_FLUSH_MAX_ATTEMPTS,
+                 max_pending: int = SESSION_MAX_PENDING):
+        self.backend = backend or InMemorySessionBackend()
+        self.max_sessions = max_sessions
+        self.flush_batch = flush_batch
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        # (session_id, record, failed attempts so far)
+        self._pending: List[Tuple[str, TurnRecord, int]] = []
+        self._timer: Optional[threading.Timer] = None
+        self.flushes = 0
+        self.records_written = 0
+        self.loads = 0
+        self.conflicts = 0
+        self.dropped = 0
+
+    def open(self, session_id: Optional[str] = None, refresh: bool = False) -> ChatSession:
+        """
+        Return the session for ``session_id``, or a new one when it is missing
+        or malformed. Pass ``refresh`` on reconnect: another replica may have
+        added turns since this process last saw the session.
+        """
+        if not session_id or not _SESSION_ID.match(session_id):
+            session_id = uuid.uuid4().hex
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+        if session is None:
+            self.flush()
+            session = ChatSession(self, session_id, self.backend.latest(session_id))
+            self.loads += 1
+            with self._lock:
+                session = self._sessions.setdefault(session_id, session)
+                self._sessions.move_to_end(session_id)
+                while len(self._sessions) > self.max_sessions:
+                    evicted, _ = self._sessions.popitem(last=False)
+                    logger.debug(f"💤 Session {evicted[:8]} dropped from memory")
+        elif refresh:
+            self.flush()
+            session.apply(self.backend.read(session_id, since_seq=session.next_seq))
+        return session
+
+    def read(self, session_id: str, until_seq: Optional[int] = None) -> List[TurnRecord]:
+        self.flush()
+        records = self.backend.read(session_id)
+        return [record for record in records if until_seq is None or record.seq < until_seq]
+
+    def append(self, session_id: str, record: TurnRecord):
+        with self._lock:
+            self._pending.append((session_id, record, 0))
+            self._trim_pending()
+            flush_now = len(self._pending) >= self.flush_batch or self.flush_interval <= 0
+            if not flush_now:
+                self._schedule_flush()
+        if flush_now:
+            self.flush()
+
+    def flush(self):
+        """Write every queued record, in one backend call when nothing conflicts"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not pending:
+                return
+            try:
+                self.backend.write([(session_id, record) for session_id, record, _ in pending])
+                written, failed = len(pending), []
+            except Exception:
+                written, failed = 0, []
+                for session_id, group in self._by_session(pending).items():
+                    try:
+                        written += self._write_session(session_id, group)
+                    except Exception as e:
+                        logger.error(f"❌ Could not write {len(group)} records "
+                                     f"for session {session_id[:8]}: {e}")
+                        failed.extend((session_id, record, attempts + 1)
+                                      for _, record, attempts in group)
+            self.flushes += 1
+            self.records_written += written
+            if written:
+                logger.debug(f"💾 Flushed {written} session records")
+            if failed:
+                self._requeue(failed)
+
+    def _write_session(self, session_id: str, group) -> int:
+        """Write one session's records; renumber them after the stored ones on conflict"""
+        records = [record for _, record, _ in group]
+        try:
+            self.backend.write([(session_id, record) for record in records])
+            return len(records)
+        except SessionConflictError:
+            latest = self.backend.latest(session_id)
+            start = latest.seq + 1 if latest else 0
+            original = records
+            records = self._renumber(session_id, records, latest, start)
+            self.backend.write([(session_id, record) for record in records])
+        self.conflicts += 1
+        logger.warning(f"⚠️ Session {session_id[:8]} was also written elsewhere; "
+                       f"{len(records)} turns renumbered from {start}")
+        with self._lock:
+            # Reloaded on next open, with the other replica's turns merged in
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.next_seq = max(session.next_seq, start + len(records))
+            # Its later commits must carry the other replica's usage too
+            session.total_usage = _rebase_usage(
+                session.total_usage, original[-1].usage, records[-1].usage)
+            session._committed_usage = copy.deepcopy(records[-1].usage)
+        return len(records)
+
+    def _renumber(self, session_id: str, records: List[TurnRecord],
+                  latest: Optional[TurnRecord], start: int) -> List[TurnRecord]:
+        """Records moved to ``start`` onwards, their usage totals rebased on ``latest``'s.
+
+        Each record stores session totals, so written as-is they would replace
+        whatever the other replica's turns added; instead each turn's own
+        usage is added on top of the stored totals. Usage resets stay resets.
+        """
+        first = records[0].seq
+        previous = next((record for record in self.backend.read(session_id, since_seq=first - 1)
+                         if record.seq == first - 1), None) if first else None
+        old_base = previous.usage if previous else new_usage()
+        new_base = latest.usage if latest else new_usage()
+        renumbered = []
+        for i, record in enumerate(records):
+            usage = (record.usage if record.usage == new_usage()
+                     else _rebase_usage(record.usage, old_base, new_base))
+            renumbered.append(record._replace(seq=start + i, usage=usage))
+            old_base, new_base = record.usage, usage
+        return renumbered
+
+    @staticmethod
+    def _by_session(pending) -> Dict[str, List[Tuple[str, TurnRecord, int]]]:
+        groups: Dict[str, List[Tuple[str, TurnRecord, int]]] = {}
+        for entry in pending:
+            groups.setdefault(entry[0], []).append(entry)
+        return groups
+
+    def _requeue(self, failed):
+        retry = [entry for entry in failed if entry[2] < self.max_attempts]
+        if len(retry) < len(failed):
+            self.dropped += len(failed) - len(retry)
+            logger.error(f"❌ Dropped {len(failed) - len(retry)} session records "
+                         f"after {self.max_attempts} failed writes")
+        with self._lock:
+            self._pending[:0] = retry
+            self._trim_pending()
+            if self._pending:
+                self._schedule_flush()
+
+    def _trim_pending(self):
+        # Called with self._lock held
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.dropped += overflow
+            logger.error(f"❌ Session write queue full: dropped {overflow} oldest records")
+
+    def _schedule_flush(self):
+        # Called with self._lock held
+        if self._timer is None:
+            self._timer = threading.Timer(max(self.flush_interval, 0.05), self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def close(self):
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__,
+                "sessions_in_memory": len(self._sessions),
+                "pending": len(self._pending),
+                "loads": self.loads,
+                "flushes": self.flushes,
+                "records_written": self.records_written,
+                "conflicts": self.conflicts,
+                "dropped": self.dropped,
+            }
+
+
+_session_store: Optional[SessionStore] = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Return the process-wide session store for the configured backend"""
+    global _session_store
+    with _session_store_lock:
+        if _session_store is None:
+            if SESSION_STORE == "sql":
+                backend = SQLSessionBackend()
+            elif SESSION_STORE == "memory":
+                backend = InMemorySessionBackend()
+            else:
+                raise ValueError(f"Unknown SESSION_STORE {SESSION_STORE!r}; use 'memory' or 'sql'")
+            _session_store = SessionStore(backend)
+            atexit.register(_session_store.close)
+        return _session_store
@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+# Keep unit tests from sharing answers through the on-disk response cache,
+# and from writing turn traces into the working tree
+os.environ.setdefault("RESPONSE_CACHE_PATH", "")
+os.environ.setdefault("TRACE_LOG_PATH", "")
+
+# assets/ modules import each other by bare name (``from database import Base``)
+# and build their engine from DATABASE_URL at import time
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "assets")
+sys.path.insert(0, os.path.abspath(ASSETS_DIR))
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tarot_test.db')}")
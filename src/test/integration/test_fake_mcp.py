@@ -0,0 +1,28 @@
+import sys
+import pytest
+from benchmarks.bench_chat import FAKE_SERVER, run_benchmark
+from src.mcp_client import MCPClient
+from src.tool_cache import ToolResultCache
+
+
+@pytest.mark.asyncio
+async def test_mcp_client_against_stand_in_server():
+    """MCPClient round trip without node, using the benchmark's Python server"""
+    client = MCPClient(cache=ToolResultCache(path=None), command=sys.executable,
+                       args=[FAKE_SERVER, "--tools", "3", "--latency-ms", "0", "--payload-bytes", "10"])
+    async with client.open_session() as (session, tools):
+        assert [tool["name"] for tool in tools] == ["lookup_0", "lookup_1", "lookup_2"]
+        content = await client.call_tool(session, "lookup_1", {"query": "routes"})
+    assert content[0]["type"] == "text"
+    assert content[0]["text"].startswith("[tool_1] routes: ")
+
+
+def test_benchmark_smoke():
+    result = run_benchmark(sessions=2, turns=1, tool_iterations=1, parallel_tools=2,
+                           tool_latency_ms=0, pool_size=1, ttft_ms=0)
+    assert result["errors"] == []
+    assert result["stopped_turns"] == {}
+    assert result["rate_limiter"]["throttled_s"] < 1
+    assert result["turn_latency_ms"]["count"] == 2
+    assert "claude.call" in result["phases_ms"]
+    assert result["pool"]["workers"] == 1
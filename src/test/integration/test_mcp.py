@@ -1,15 +1,23 @@
 import pytest
 import asyncio
 import subprocess
+from pathlib import Path
 from src.mcp_client import MCPClient
 
+REPO_ROOT = Path(__file__).resolve().parents[3]
+MCP_BUILD = REPO_ROOT / "vapi-doc-coding-mcp" / "build" / "index.js"
+
+pytestmark = pytest.mark.skipif(
+    not MCP_BUILD.exists(),
+    reason="vapi-doc-coding-mcp is not built; see test_fake_mcp.py for the offline test")
+
 
 @pytest.fixture(scope="module", autouse=True)
 def start_mcp_server():
     """Start the MCP server before running the test."""
     process = subprocess.Popen(
-        ["node", "vapi-doc-coding-mcp/build/index.js"],
-        cwd="/Users/nmolivo/Documents/Repos/gala-deck",
+        ["node", str(MCP_BUILD)],
+        cwd=REPO_ROOT,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE
     )
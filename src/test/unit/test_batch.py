@@ -0,0 +1,72 @@
+import json
+import pytest
+from benchmarks.fake_anthropic import FakeAsyncAnthropic
+from src.batch import run_batch
+from src.chat_handler import ChatHandler
+from src.tracing import TraceRecorder
+
+
+class InstantPool:
+    async def get_tools(self):
+        return [{"name": "lookup", "description": "", "input_schema": {"type": "object"}}]
+
+    async def call_tool(self, tool_name, arguments):
+        return [{"type": "text", "text": "ok"}]
+
+
+@pytest.fixture
+def handler():
+    client = FakeAsyncAnthropic(tool_iterations=1, ttft_ms=0, chunk_delay_ms=0, answer_words=3)
+    return ChatHandler(client, InstantPool(), recorder=TraceRecorder(path=None))
+
+
+def write_jsonl(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records))
+
+
+def test_batch_writes_results_and_resumes(tmp_path, handler):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_jsonl(source, [{"id": f"q{i}", "prompt": f"question {i}"} for i in range(5)])
+    # A previous run finished q0 and failed q1
+    write_jsonl(output, [{"id": "q0", "status": "ok"}, {"id": "q1", "status": "error"}])
+
+    totals = handler._background.run(run_batch(handler, str(source), str(output), concurrency=2))
+
+    assert totals["skipped"] == 1
+    assert totals["ok"] == 4
+    results = [json.loads(line) for line in output.read_text().splitlines()][2:]
+    assert sorted(r["id"] for r in results) == ["q1", "q2", "q3", "q4"]
+    assert all(r["response"] == "answer answer answer" for r in results)
+    assert all(r["usage"]["input_tokens"] > 0 and "cost" in r for r in results)
+
+
+def test_bad_records_get_error_lines(tmp_path, handler):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    source.write_text('{"id": "q0", "prompt": "question"}\n'
+                      '{not json\n'
+                      '{"id": "q2", "question": "wrong field"}\n'
+                      '{"id": "q3", "messages": []}\n'
+                      '{"id": "q4", "prompt": "question"}\n')
+
+    totals = handler._background.run(run_batch(handler, str(source), str(output), concurrency=2))
+
+    results = {r["id"]: r for r in map(json.loads, output.read_text().splitlines())}
+    assert totals["ok"] == 2 and totals["error"] == 3
+    assert results["q0"]["status"] == results["q4"]["status"] == "ok"
+    assert "invalid JSON on line 2" in results["2"]["error"]
+    assert results["q2"]["status"] == results["q3"]["status"] == "error"
+
+
+def test_in_flight_turns_finish_when_reading_fails(tmp_path, handler, monkeypatch):
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+
+    def broken_records(path, prompt_field):
+        yield "q0", [{"role": "user", "content": "question"}], None
+        raise OSError("disk went away")
+
+    monkeypatch.setattr("src.batch.read_records", broken_records)
+    with pytest.raises(OSError):
+        handler._background.run(run_batch(handler, str(source), str(output), concurrency=2))
+
+    [result] = map(json.loads, output.read_text().splitlines())
+    assert result["id"] == "q0" and result["status"] == "ok"
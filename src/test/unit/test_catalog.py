@@ -0,0 +1,38 @@
+import pytest
+from assets.catalog import CardCatalog, CardRecord, get_catalog
+
+
+def test_full_deck_is_indexed():
+    catalog = get_catalog()
+    assert len(catalog) == 78
+    assert get_catalog() is catalog  # loaded once
+    assert len(catalog.by_arcana("major")) == 22
+    assert len(catalog.by_suit("cups")) == 14
+    assert all(card.element == "fire" for card in catalog.by_suit("wands"))
+    assert [card.id for card in catalog] == sorted(card.id for card in catalog)
+
+
+def test_lookups():
+    catalog = get_catalog()
+    fool = catalog.by_name("  the FOOL ")
+    assert fool is catalog.get(0) is catalog.by_arcana_number("major", 0)
+    assert catalog.by_arcana_number("minor", 1, "wands").name == "Ace of Wands"
+    assert fool in catalog.with_keyword("Leap of Faith")
+    assert fool in catalog.with_keyword("leap")
+    assert catalog.by_name("not a card") is None and catalog.with_keyword("zzz") == ()
+
+
+def test_catalog_is_immutable():
+    catalog = get_catalog()
+    with pytest.raises(AttributeError):
+        catalog.get(0).name = "x"
+    with pytest.raises(TypeError):
+        catalog.keywords["new"] = ()
+    assert isinstance(catalog.get(0).keywords, tuple)
+
+
+def test_duplicate_ids_are_rejected():
+    card = CardRecord.from_dict({"id": 1, "name": "A", "arcana": "major", "number": 1,
+                                 "element": "air", "prompt_template": "{token}"})
+    with pytest.raises(ValueError):
+        CardCatalog([card, card._replace(name="B")])
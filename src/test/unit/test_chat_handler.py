@@ -0,0 +1,294 @@
+import asyncio
+import threading
+import time
+from anthropic.types import Message, TextBlock, ToolUseBlock, Usage
+from src.chat_handler import ChatHandler
+from src.errors import MCPPoolTimeoutError
+from src.mcp_client import MCPClient
+from src.rate_limiter import RateLimiter
+from test_rate_limiter import api_error
+from anthropic import RateLimitError
+
+
+def make_message(content, stop_reason):
+    return Message(id="msg", type="message", role="assistant", model="test",
+                   content=content, stop_reason=stop_reason,
+                   usage=Usage(input_tokens=10, output_tokens=5))
+
+
+class FakeStream:
+    def __init__(self, message):
+        self.message = message
+        self.texts = [] if isinstance(message, Exception) else [
+            block.text for block in message.content if block.type == "text"]
+
+    async def __aenter__(self):
+        if isinstance(self.message, Exception):
+            raise self.message
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        for text in self.texts:
+            yield text
+
+    async def get_final_message(self):
+        return self.message
+
+
+class ScriptedMessages:
+    """Fake ``client.messages`` returning canned responses in order"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def stream(self, **kwargs):
+        self.calls.append(kwargs)
+        return FakeStream(self.responses.pop(0))
+
+
+class FakeClient:
+    def __init__(self, responses):
+        self.messages = ScriptedMessages(responses)
+
+
+class FakePool:
+    """Fake MCP pool where every tool call sleeps for ``delay`` seconds"""
+
+    def __init__(self, delay=0.1):
+        self.delay = delay
+
+    async def get_tools(self):
+        return [{"name": "lookup", "description": "", "input_schema": {"type": "object"}}]
+
+    async def call_tool(self, tool_name, arguments):
+        await asyncio.sleep(self.delay)
+        return f"result {next(iter(arguments.values()))}"
+
+
+def test_parallel_tool_calls_share_one_result_message():
+    tool_turn = make_message([
+        ToolUseBlock(id=f"tu{i}", type="tool_use", name="lookup", input={"q": i})
+        for i in range(3)
+    ], "tool_use")
+    final = make_message([TextBlock(type="text", text="done")], "end_turn")
+    client = FakeClient([tool_turn, final])
+    handler = ChatHandler(client, FakePool(delay=0.1))
+    messages = [{"role": "user", "content": "hi"}]
+
+    started = time.monotonic()
+    text, usage = handler.chat(messages)
+    elapsed = time.monotonic() - started
+
+    assert text == "done"
+    assert elapsed < 0.25  # three 0.1s calls ran concurrently
+    assert usage["input_tokens"] == 20
+    assert [m["role"] for m in messages] == ["user", "assistant", "user"]
+    results = messages[-1]["content"]
+    assert [r["tool_use_id"] for r in results] == ["tu0", "tu1", "tu2"]
+    assert [r["content"] for r in results] == ["result 0", "result 1", "result 2"]
+
+
+def test_failed_tool_results_are_flagged():
+    tool_turn = make_message([
+        ToolUseBlock(id="tu0", type="tool_use", name="lookup", input={"q": 0}),
+        ToolUseBlock(id="tu1", type="tool_use", name="lookup", input={"q": 1}),
+    ], "tool_use")
+    final = make_message([TextBlock(type="text", text="done")], "end_turn")
+
+    class HalfBrokenPool(FakePool):
+        async def call_tool(self, tool_name, arguments):
+            if arguments["q"]:
+                return MCPClient().tool_error(tool_name, RuntimeError("down"))
+            return "fine"
+
+    messages = [{"role": "user", "content": "hi"}]
+    ChatHandler(FakeClient([tool_turn, final]), HalfBrokenPool()).chat(messages)
+
+    ok, failed = messages[2]["content"]
+    assert "is_error" not in ok
+    assert failed["is_error"] is True and failed["content"].startswith("Error:")
+
+
+def test_chat_stream_yields_text_and_tool_events():
+    tool_turn = make_message([
+        TextBlock(type="text", text="Let me check."),
+        ToolUseBlock(id="tu0", type="tool_use", name="lookup", input={"q": 1}),
+    ], "tool_use")
+    final = make_message([TextBlock(type="text", text="Found it.")], "end_turn")
+    handler = ChatHandler(FakeClient([tool_turn, final]), FakePool(delay=0))
+    tool_events = []
+
+    stream = handler.chat_stream([{"role": "user", "content": "hi"}], on_tool=tool_events.append)
+    chunks = list(stream)
+
+    assert "".join(chunks) == "Let me check.\n\nFound it."
+    assert [e["type"] for e in tool_events] == ["tool_use", "tool_done"]
+    assert stream.usage["output_tokens"] == 10
+
+
+def test_requests_carry_cache_breakpoints():
+    final = make_message([TextBlock(type="text", text="ok")], "end_turn")
+    client = FakeClient([final])
+    handler = ChatHandler(client, FakePool())
+    messages = [{"role": "user", "content": "hi"}]
+
+    handler.chat(messages)
+
+    request = client.messages.calls[0]
+    assert request["tools"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert request["messages"][-1]["content"] == [
+        {"type": "text", "text": "hi", "cache_control": {"type": "ephemeral"}}]
+    assert messages == [{"role": "user", "content": "hi"}]  # history left untouched
+
+
+def test_rate_limited_call_is_retried_before_streaming():
+    final = make_message([TextBlock(type="text", text="ok")], "end_turn")
+    client = FakeClient([api_error(RateLimitError, 429, {"retry-after": "0"}), final])
+    limiter = RateLimiter(base_delay=0.001)
+    handler = ChatHandler(client, FakePool(), limiter=limiter)
+
+    text, usage = handler.chat([{"role": "user", "content": "hi"}])
+
+    assert text == "ok"
+    assert len(client.messages.calls) == 2
+    assert limiter.stats()["retries"] == 1
+
+
+def test_tool_loop_stops_at_iteration_cap(monkeypatch):
+    from benchmarks.fake_anthropic import FakeAsyncAnthropic
+    monkeypatch.setattr("src.chat_handler.MAX_TOOL_ITERATIONS", 2)
+    client = FakeAsyncAnthropic(tool_iterations=10, ttft_ms=0, chunk_delay_ms=0, answer_words=2)
+    handler = ChatHandler(client, FakePool(delay=0))
+    messages = [{"role": "user", "content": "hi"}]
+
+    text, usage = handler.chat(messages)
+
+    assert text.strip() == "answer answer"
+    assert usage["stop_cause"] == "max_iterations"
+    assert client.requests[-1]["tool_choice"] == {"type": "none"}
+    # the third tool round was never run but still got (error) results
+    assert messages[-1]["content"][0]["is_error"] is True
+    assert len(client.requests) == 4
+
+
+def test_turn_deadline_cancels_slow_tools(monkeypatch):
+    from benchmarks.fake_anthropic import FakeAsyncAnthropic
+    monkeypatch.setattr("src.chat_handler.TURN_DEADLINE_SECONDS", 0.2)
+    client = FakeAsyncAnthropic(tool_iterations=1, ttft_ms=0, chunk_delay_ms=0)
+    handler = ChatHandler(client, FakePool(delay=5))
+
+    started = time.monotonic()
+    text, usage = handler.chat([{"role": "user", "content": "hi"}])
+
+    assert time.monotonic() - started < 2
+    assert usage["stop_cause"] == "deadline"
+    assert text.startswith("answer")
+
+
+class FailingPool(FakePool):
+    async def call_tool(self, tool_name, arguments):
+        raise MCPPoolTimeoutError(1, 3)
+
+
+class BlockingPool(FakePool):
+    """Tool calls never finish; ``started`` is set once one is running"""
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+
+    async def call_tool(self, tool_name, arguments):
+        self.started.set()
+        await asyncio.sleep(60)
+
+
+class OneFailingPool(FakePool):
+    """First tool call fails at once; the others block until cancelled"""
+
+    def __init__(self):
+        super().__init__()
+        self.cancelled = 0
+
+    async def call_tool(self, tool_name, arguments):
+        if arguments["q"] == 0:
+            await asyncio.sleep(0.01)
+            raise MCPPoolTimeoutError(1, 3)
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def _tool_turn():
+    return make_message([
+        TextBlock(type="text", text="Let me check."),
+        ToolUseBlock(id="tu0", type="tool_use", name="lookup", input={"q": 1}),
+    ], "tool_use")
+
+
+def test_failed_tool_round_still_answers_every_tool_use():
+    handler = ChatHandler(FakeClient([_tool_turn()]), FailingPool())
+    messages = [{"role": "user", "content": "hi"}]
+
+    text, usage = handler.chat(messages)
+
+    assert "MCP Server Busy" in text and usage == {}
+    assert [m["role"] for m in messages] == ["user", "assistant", "user"]
+    assert messages[-1]["content"][0]["tool_use_id"] == "tu0"
+    assert messages[-1]["content"][0]["is_error"] is True
+
+
+def test_failing_tool_call_cancels_its_siblings():
+    tool_turn = make_message([
+        ToolUseBlock(id=f"tu{i}", type="tool_use", name="lookup", input={"q": i})
+        for i in range(3)
+    ], "tool_use")
+    pool = OneFailingPool()
+    handler = ChatHandler(FakeClient([tool_turn]), pool)
+
+    started = time.monotonic()
+    text, _ = handler.chat([{"role": "user", "content": "hi"}])
+
+    assert "MCP Server Busy" in text
+    assert time.monotonic() - started < 5
+    assert pool.cancelled == 2
+
+
+def test_closing_the_stream_mid_round_still_answers_every_tool_use():
+    pool = BlockingPool()
+    handler = ChatHandler(FakeClient([_tool_turn()]), pool)
+    messages = [{"role": "user", "content": "hi"}]
+
+    chunks = iter(handler.chat_stream(messages))
+    assert next(chunks) == "Let me check."
+    assert pool.started.wait(5)
+    chunks.close()  # what a Streamlit rerun does to an unfinished st.write_stream
+
+    assert [m["role"] for m in messages] == ["user", "assistant", "user"]
+    assert "cancelled" in messages[-1]["content"][0]["content"]
+
+
+def test_router_picks_model_per_request_and_costs_are_split():
+    from src.config import calculate_cost
+    from src.model_router import ModelRouter
+    tool_turn = make_message([
+        ToolUseBlock(id="tu0", type="tool_use", name="lookup", input={"q": 1})], "tool_use")
+    final = make_message([TextBlock(type="text", text="done")], "end_turn")
+    client = FakeClient([tool_turn, final])
+    router = ModelRouter(default_model="big", fast_model="small", short_prompt_chars=0,
+                         route_continuations=True)
+    handler = ChatHandler(client, FakePool(delay=0), router=router)
+
+    text, usage = handler.chat([{"role": "user", "content": "hi"}])
+
+    assert [call["model"] for call in client.messages.calls] == ["big", "small"]
+    assert usage["by_model"]["big"]["calls"] == usage["by_model"]["small"]["calls"] == 1
+    assert usage["input_tokens"] == 20
+    assert calculate_cost(usage) == 0.0  # neither test model has pricing
+    assert handler.session_cost == 0.0
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from sqlalchemy import func, select
+
+import database
+from models import Card
+import seed
+
+
+@pytest.fixture
+def seeded():
+    database.Base.metadata.drop_all(bind=database.engine)
+    database.Base.metadata.create_all(bind=database.engine)
+    seed.seed_cards(database.engine)
+    yield
+    asyncio.run(database.dispose_async_engine())
+    database.Base.metadata.drop_all(bind=database.engine)
+
+
+def test_async_url_uses_async_driver():
+    assert database.ASYNC_DATABASE_URL.startswith("sqlite+aiosqlite://")
+
+
+@pytest.mark.asyncio
+async def test_async_sessions_share_one_lazy_engine(seeded):
+    assert database.get_async_engine() is database.get_async_engine()
+
+    async def count_major():
+        sessions = database.get_async_db()  # driven the way FastAPI drives a dependency
+        db = await anext(sessions)
+        try:
+            return await db.scalar(
+                select(func.count()).select_from(Card).where(Card.arcana == "MAJOR"))
+        finally:
+            await sessions.aclose()
+
+    counts = await asyncio.gather(*(count_major() for _ in range(5)))
+    assert counts == [22] * 5
+
+    stats = database.pool_stats()["async"]
+    assert stats["pool"] == "TimedAsyncQueuePool"
+    assert stats["checkouts"] >= 1 and stats["in_use"] == 0
+    assert stats["max_wait_ms"] >= stats["avg_wait_ms"] >= 0
+
+
+def test_sync_pool_reports_in_use_connections(seeded):
+    with database.SessionLocal() as db:
+        db.execute(select(Card.id)).first()
+        assert database.pool_stats()["sync"]["in_use"] == 1
+    assert database.pool_stats()["sync"]["in_use"] == 0
+    assert database.pool_stats()["sync"]["size"] == database.DB_POOL_SIZE
@@ -0,0 +1,43 @@
+import json
+import time
+import pytest
+from assets.generation import (CompiledTemplate, StubBackend, render_prompts, run_generation,
+                               load_completed)
+
+
+def test_templates_render_every_card_and_style():
+    template = CompiledTemplate("a {token} cat {not_a_token} in {token}")
+    assert template.render("ink") == "a ink cat {not_a_token} in ink"
+    with pytest.raises(ValueError):
+        CompiledTemplate("no placeholder")
+
+    jobs = render_prompts(["watercolor", "Art Nouveau"])
+    assert len(jobs) == 156
+    assert jobs[1].job_id == "0:art-nouveau"
+    assert jobs[1].prompt.endswith("in the style of Art Nouveau")
+    assert all("{token}" not in job.prompt for job in jobs)
+
+
+def test_interrupted_run_resumes_from_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "gen.jsonl")
+    failing = StubBackend(fail_job_ids={"5:ink", "9:ink"})
+
+    first = run_generation(failing, ["ink"], checkpoint, workers=4)
+    assert (first["ok"], first["error"]) == (76, 2)
+
+    retry = StubBackend()
+    second = run_generation(retry, ["ink"], checkpoint, workers=4)
+    assert sorted(retry.calls) == ["5:ink", "9:ink"]  # only the failures are redone
+    assert (second["skipped"], second["ok"]) == (76, 2)
+    assert len(load_completed(checkpoint)) == 78
+    with open(checkpoint) as f:
+        assert json.loads(f.readline())["output"].startswith("stub://")
+
+
+def test_worker_pool_bounds_concurrency(tmp_path):
+    backend = StubBackend(delay=0.02)
+    started = time.perf_counter()
+    totals = run_generation(backend, ["a"], str(tmp_path / "gen.jsonl"), workers=8)
+    elapsed = time.perf_counter() - started
+    assert totals["ok"] == 78
+    assert 0.02 * 78 / 8 <= elapsed < 0.02 * 78 / 2  # ran in parallel, at most 8 at a time
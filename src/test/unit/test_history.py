@@ -0,0 +1,71 @@
+from src.history import HistoryManager, ELIDED_TOOL_RESULT, MISSING_TOOL_RESULT
+
+
+def tool_turn(question, tool_id, payload):
+    return [
+        {"role": "user", "content": question},
+        {"role": "assistant", "content": [
+            {"type": "tool_use", "id": tool_id, "name": "lookup", "input": {}}]},
+        {"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": tool_id, "content": payload}]},
+        {"role": "assistant", "content": "answer"},
+    ]
+
+
+def tool_ids(messages, block_type):
+    return [block["id" if block_type == "tool_use" else "tool_use_id"]
+            for message in messages if isinstance(message["content"], list)
+            for block in message["content"] if block.get("type") == block_type]
+
+
+def test_old_tool_results_are_elided_and_input_untouched():
+    messages = tool_turn("first?", "a", "x" * 4000) + tool_turn("second?", "b", "y" * 4000)
+    original = [dict(m) for m in messages]
+    compacted = HistoryManager(budget_tokens=10_000).compact(messages)
+    assert compacted[2]["content"][0]["content"] == ELIDED_TOOL_RESULT
+    assert compacted[6]["content"][0]["content"] == "y" * 4000
+    assert messages == original
+
+
+def test_over_budget_drops_whole_turns_and_keeps_pairs_valid():
+    messages = []
+    for i in range(5):
+        messages += tool_turn(f"question {i}?", f"t{i}", "z" * 2000)
+    messages.append({"role": "user", "content": "latest?"})
+    manager = HistoryManager(budget_tokens=1200, keep_tool_results_turns=10)
+
+    compacted = manager.compact(messages)
+
+    assert compacted[0]["role"] == "user"
+    assert "question 0?" in compacted[0]["content"][0]["text"]
+    assert compacted[-1]["content"] == "latest?"
+    assert tool_ids(compacted, "tool_use") == tool_ids(compacted, "tool_result")
+    assert manager.total_tokens(compacted) < manager.total_tokens(messages)
+
+
+def test_token_counts_are_cached_per_message():
+    manager = HistoryManager()
+    message = {"role": "user", "content": "a" * 400}
+    assert manager.count_tokens(message) == 104
+    message["content"] = ""  # cached value is reused for the same object
+    assert manager.count_tokens(message) == 104
+
+
+def test_tool_use_without_result_is_repaired():
+    messages = tool_turn("first?", "a", "ok")[:2] + [
+        {"role": "assistant", "content": "MCP Server Busy"},  # error text from a failed turn
+        {"role": "user", "content": "again?"},
+    ]
+    partial = tool_turn("second?", "b", "ok")
+    partial[1]["content"].append({"type": "tool_use", "id": "c", "name": "lookup", "input": {}})
+    messages += partial[1:3] + [{"role": "user", "content": "latest?"}]
+
+    compacted = HistoryManager(keep_tool_results_turns=10).compact(messages)
+
+    assert sorted(tool_ids(compacted, "tool_use")) == sorted(tool_ids(compacted, "tool_result"))
+    assert compacted[2]["content"][0]["tool_use_id"] == "a"
+    assert compacted[2]["content"][0]["is_error"] is True
+    assert compacted[6]["content"][0] == {
+        "type": "tool_result", "tool_use_id": "c", "content": MISSING_TOOL_RESULT, "is_error": True}
+    assert [m["role"] for m in compacted[:4]] == ["user", "assistant", "user", "assistant"]
+    assert len(messages) == 7  # input untouched
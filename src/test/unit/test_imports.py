@@ -0,0 +1,29 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[3]
+
+
+def _run(code: str) -> str:
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=ROOT, check=True)
+    return result.stdout.strip()
+
+
+def test_import_src_is_lazy():
+    loaded = _run("import sys, src, src.config; "
+                  "print(' '.join(m for m in ('anthropic', 'mcp', 'src.chat_handler') if m in sys.modules))")
+    assert loaded == ""
+
+
+def test_app_modules_defer_the_sdks():
+    loaded = _run("import sys, src.chat_handler, src.mcp_pool, src.rate_limiter, src.session_store; "
+                  "print(' '.join(m for m in ('anthropic', 'mcp') if m in sys.modules))")
+    assert loaded == ""
+
+
+def test_exports_resolve_on_access():
+    assert _run("import src; print(src.ChatHandler.__module__, src.MODEL_NAME == "
+                "__import__('src.config').config.MODEL_NAME)") == "src.chat_handler True"
+    assert "ChatHandler" in _run("import src; print(dir(src))")
@@ -0,0 +1,30 @@
+from anthropic.types import TextBlock, ToolUseBlock
+from src.chat_handler import ChatHandler
+from src.local_tools import call_local_tool, tool_definitions
+from test_chat_handler import FakeClient, FakePool, make_message
+
+
+def test_card_tools():
+    assert "Three of Swords" in call_local_tool("search_cards", {"query": "grief and heartbreak"})
+    assert call_local_tool("get_card", {"name": "the fool"}).startswith("The Fool (major arcana, air)")
+    assert "No card named" in call_local_tool("get_card", {"name": "Joker"})
+    assert call_local_tool("search_cards", {"q": "x"}).startswith("Error calling search_cards")
+
+
+def test_handler_answers_local_tools_without_mcp():
+    class NoToolPool(FakePool):
+        async def call_tool(self, tool_name, arguments):
+            raise AssertionError("local tool was sent to MCP")
+
+    tool_turn = make_message([ToolUseBlock(id="tu0", type="tool_use", name="get_card",
+                                           input={"name": "The Tower"})], "tool_use")
+    final = make_message([TextBlock(type="text", text="done")], "end_turn")
+    client = FakeClient([tool_turn, final])
+    messages = [{"role": "user", "content": "what does the tower mean?"}]
+
+    text, _ = ChatHandler(client, NoToolPool()).chat(messages)
+
+    assert text == "done"
+    assert [t["name"] for t in client.messages.calls[0]["tools"]][-len(tool_definitions()):] == [
+        "search_cards", "get_card"]
+    assert messages[-1]["content"][0]["content"].startswith("The Tower")
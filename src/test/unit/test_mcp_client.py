@@ -0,0 +1,31 @@
+from mcp.types import (TextContent, ImageContent, EmbeddedResource,
+                       TextResourceContents, BlobResourceContents)
+from src.mcp_client import to_anthropic_content
+
+
+def test_text_is_passed_through_raw():
+    blocks = to_anthropic_content([TextContent(type="text", text="line 1\nline 2")])
+    assert blocks == [{"type": "text", "text": "line 1\nline 2"}]
+
+
+def test_images_and_resources_are_mapped():
+    blocks = to_anthropic_content([
+        ImageContent(type="image", data="aGk=", mimeType="image/png"),
+        EmbeddedResource(type="resource", resource=TextResourceContents(
+            uri="file:///routes.md", mimeType="text/markdown", text="# Routes")),
+        EmbeddedResource(type="resource", resource=BlobResourceContents(
+            uri="file:///spec.pdf", mimeType="application/pdf", blob="JVBE")),
+    ])
+    assert blocks[0] == {"type": "image", "source": {
+        "type": "base64", "media_type": "image/png", "data": "aGk="}}
+    assert blocks[1] == {"type": "text", "text": "[file:///routes.md]\n# Routes"}
+    assert blocks[2]["type"] == "document"
+
+
+def test_oversized_text_is_truncated():
+    blocks = to_anthropic_content(
+        [TextContent(type="text", text="a" * 50), TextContent(type="text", text="b" * 50)],
+        max_chars=30)
+    assert blocks[0]["text"].startswith("a" * 30)
+    assert "truncated 20 characters" in blocks[0]["text"]
+    assert blocks[-1]["text"] == "…[1 more text blocks truncated]"
@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from src.errors import MCPPoolTimeoutError
+from src.event_loop import BackgroundLoop
+from src.mcp_pool import MCPSessionPool
+
+
+class SlowMCPClient:
+    """Fake MCPClient whose tool calls take a fixed time"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+
+    @asynccontextmanager
+    async def open_session(self):
+        yield object(), [{"name": "slow"}]
+
+    async def execute_tool(self, session, tool_name, arguments):
+        await asyncio.sleep(self.delay)
+        return str(id(session))
+
+    def tool_error(self, tool_name, error):
+        return f"Error: {error!r}"
+
+
+@pytest.fixture
+def background():
+    background = BackgroundLoop("test-pool-loop")
+    yield background
+    background.stop()
+
+
+@pytest.mark.asyncio
+async def test_pool_never_exceeds_max_size(background):
+    pool = MCPSessionPool(max_size=2, acquire_timeout=5,
+                          client_factory=SlowMCPClient, background_loop=background)
+    results = await asyncio.gather(*(pool.call_tool("slow", {}) for _ in range(6)))
+    stats = pool.stats()
+    assert len(set(results)) == 2
+    assert stats["workers"] == 2
+    assert stats["acquires"] == 6
+    assert stats["queue_depth"] == 0
+    pool.close()
+
+
+@pytest.mark.asyncio
+async def test_acquire_times_out_when_all_workers_busy(background):
+    pool = MCPSessionPool(max_size=1, acquire_timeout=0.05,
+                          client_factory=lambda: SlowMCPClient(delay=0.5),
+                          background_loop=background)
+    first = asyncio.ensure_future(pool.call_tool("slow", {}))
+    await asyncio.sleep(0.01)
+    with pytest.raises(MCPPoolTimeoutError):
+        await pool.call_tool("slow", {})
+    await first
+    assert pool.stats()["timeouts"] == 1
+    pool.close()
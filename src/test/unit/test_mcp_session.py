@@ -0,0 +1,60 @@
+import pytest
+import anyio
+from contextlib import asynccontextmanager
+from src.event_loop import BackgroundLoop
+from src.mcp_session import MCPSessionManager
+
+
+class FakeMCPClient:
+    """Stands in for MCPClient; every open_session is a new 'server process'"""
+
+    def __init__(self):
+        self.starts = 0
+        self.fail_next_call = False
+
+    @asynccontextmanager
+    async def open_session(self):
+        self.starts += 1
+        yield f"session-{self.starts}", [{"name": "echo"}]
+
+    async def execute_tool(self, session, tool_name, arguments):
+        if self.fail_next_call:
+            self.fail_next_call = False
+            raise anyio.ClosedResourceError()
+        return f"{session}:{arguments['text']}"
+
+    def tool_error(self, tool_name, error):
+        return f"Error: {error!r}"
+
+
+@pytest.fixture
+def manager():
+    background = BackgroundLoop("test-loop")
+    client = FakeMCPClient()
+    manager = MCPSessionManager(client, background)
+    yield manager
+    manager.close()
+    background.stop()
+
+
+@pytest.mark.asyncio
+async def test_session_is_reused_across_turns(manager):
+    assert await manager.get_tools() == [{"name": "echo"}]
+    assert await manager.call_tool("echo", {"text": "a"}) == "session-1:a"
+    assert await manager.call_tool("echo", {"text": "b"}) == "session-1:b"
+    assert manager.client.starts == 1
+
+
+@pytest.mark.asyncio
+async def test_reconnects_when_server_dies(manager):
+    await manager.start()
+    manager.client.fail_next_call = True
+    assert await manager.call_tool("echo", {"text": "a"}) == "session-2:a"
+    assert manager.restart_count == 1
+
+
+def test_close_stops_server(manager):
+    manager._background.run(manager._ensure_started())
+    assert manager.is_running
+    manager.close()
+    assert not manager.is_running
@@ -0,0 +1,26 @@
+from src.config import MODEL_NAME, PRICING, calculate_cost
+from src.model_router import ModelRouter
+
+
+def test_rules_apply_in_order():
+    router = ModelRouter(default_model="big", fast_model="small", short_prompt_chars=20,
+                         route_continuations=False, session_budget=1.0)
+    long_question = "please compare every endpoint in the docs"
+    assert router.choose("hi?") == ("small", "short_prompt")
+    assert router.choose(long_question) == ("big", "default")
+    assert router.choose(long_question, continuation=True) == ("big", "default")
+    assert router.choose(long_question, session_cost=1.5) == ("small", "budget")
+    assert ModelRouter(default_model="big", fast_model="").choose("hi?") == ("big", "default")
+
+
+def test_routing_is_off_by_default():
+    assert ModelRouter().choose("hi?", continuation=True) == (MODEL_NAME, "default")
+
+
+def test_cost_is_summed_per_model():
+    sonnet, haiku = list(PRICING)[:2]
+    usage = {"input_tokens": 2_000_000, "output_tokens": 0, "by_model": {
+        sonnet: {"input_tokens": 1_000_000, "output_tokens": 0},
+        haiku: {"input_tokens": 1_000_000, "output_tokens": 0},
+    }}
+    assert calculate_cost(usage) == PRICING[sonnet]["input"] + PRICING[haiku]["input"]
@@ -0,0 +1,61 @@
+import asyncio
+import time
+import httpx
+import pytest
+from anthropic import APIStatusError, AuthenticationError, InternalServerError, RateLimitError
+from src.errors import APIAuthError, APIRateLimitError
+from src.rate_limiter import RateLimiter, TokenBucket
+
+
+def api_error(cls, status, headers=None):
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return cls("error", response=response, body=None)
+
+
+@pytest.mark.asyncio
+async def test_bucket_waits_for_refill():
+    bucket = TokenBucket(per_minute=600)  # 10 per second
+    for _ in range(600):
+        await bucket.acquire()
+    started = time.monotonic()
+    await bucket.acquire(2)
+    assert 0.15 < time.monotonic() - started < 0.5
+
+
+@pytest.mark.asyncio
+async def test_in_flight_requests_are_capped():
+    limiter = RateLimiter(requests_per_minute=0, input_tokens_per_minute=0, max_in_flight=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.request():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.02)
+
+    await asyncio.gather(*(call() for _ in range(6)))
+    assert peak == 2
+    assert limiter.stats()["queued"] == 0
+
+
+def test_retry_after_is_honored_then_mapped_when_exhausted():
+    limiter = RateLimiter(max_retries=2, base_delay=0.01, max_delay=30)
+    error = api_error(RateLimitError, 429, {"retry-after": "3"})
+    assert 3.0 <= limiter.retry_delay(error, 0) <= 3.01
+    with pytest.raises(APIRateLimitError):
+        limiter.retry_delay(error, 2)
+
+
+def test_auth_errors_are_not_retried():
+    with pytest.raises(APIAuthError):
+        RateLimiter().retry_delay(api_error(AuthenticationError, 401), 0)
+
+
+def test_exhausted_server_errors_are_not_reported_as_rate_limits():
+    limiter = RateLimiter(max_retries=1, base_delay=0.01)
+    outage = api_error(InternalServerError, 503)
+    with pytest.raises(InternalServerError):
+        limiter.retry_delay(outage, 1)
+    with pytest.raises(APIRateLimitError):
+        limiter.retry_delay(api_error(APIStatusError, 529), 1)
@@ -0,0 +1,41 @@
+import pytest
+from assets.reading import SPREADS, ReadingEngine
+
+
+def test_seeded_draws_are_reproducible_and_distinct():
+    engine = ReadingEngine()
+    reading = engine.draw("celtic_cross", seed=42)
+    assert reading == engine.draw("celtic_cross", seed=42)
+    assert reading != engine.draw("celtic_cross", seed=43)
+    assert [drawn.position for drawn in reading.cards] == list(SPREADS["celtic_cross"].positions)
+    assert len({drawn.card.id for drawn in reading.cards}) == 10
+
+    unseeded = engine.draw("single")
+    assert engine.draw("single", seed=unseeded.seed) == unseeded
+
+
+def test_reversal_probability():
+    engine = ReadingEngine()
+    upright = engine.draw("celtic_cross", seed=1, reversal_probability=0.0)
+    assert not any(drawn.reversed for drawn in upright.cards)
+    reversed_ = engine.draw("three_card", seed=1, reversal_probability=1.0)
+    assert all(drawn.meaning == drawn.card.meaning_reversed for drawn in reversed_.cards)
+    with pytest.raises(ValueError):
+        engine.draw("three_card", reversal_probability=1.5)
+    with pytest.raises(ValueError):
+        engine.draw("horseshoe")
+
+
+def test_bulk_draws_are_fair():
+    np = pytest.importorskip("numpy")
+    engine = ReadingEngine()
+    ids, reversed_ = engine.bulk_draw(100_000, "three_card", seed=7, reversal_probability=0.25)
+
+    assert ids.shape == reversed_.shape == (100_000, 3)
+    assert all(len(set(row)) == 3 for row in ids[:1000].tolist())  # no repeats within a draw
+    counts = engine.card_counts(ids)
+    expected = ids.size / 78
+    chi2 = (((counts - expected) ** 2) / expected).sum()
+    assert chi2 < 130  # 77 degrees of freedom; p < 0.001 above ~125
+    assert abs(reversed_.mean() - 0.25) < 0.01
+    assert np.array_equal(engine.bulk_draw(10, 5, seed=3)[0], engine.bulk_draw(10, 5, seed=3)[0])
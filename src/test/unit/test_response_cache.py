@@ -0,0 +1,66 @@
+from anthropic.types import TextBlock, ToolUseBlock
+from src.chat_handler import ChatHandler
+from src.config import MODEL_NAME, calculate_cost
+from src.errors import ToolErrorText
+from src.response_cache import ResponseCache
+from test_chat_handler import FakeClient, FakePool, make_message
+
+
+def test_key_ignores_whitespace_but_not_model_or_content():
+    key = ResponseCache.make_key([{"role": "user", "content": "List  all routes\n"}], "m1")
+    assert key == ResponseCache.make_key(
+        [{"role": "user", "content": [{"type": "text", "text": "List all routes"}]}], "m1")
+    assert key != ResponseCache.make_key([{"role": "user", "content": "List all routes"}], "m2")
+    assert key != ResponseCache.make_key([{"role": "user", "content": "List some routes"}], "m1")
+
+
+def test_entries_persist_expire_and_are_evicted(tmp_path):
+    path = str(tmp_path / "responses.sqlite3")
+    cache = ResponseCache(path=path, ttl=60, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, "m", f"answer {key}", 100.0)
+    assert cache.get("a")["text"] == "answer a"
+
+    reopened = ResponseCache(path=path, ttl=60, max_entries=2)  # prunes to 2 entries on open
+    assert reopened.get("a") is not None and reopened.get("b") is None
+    assert ResponseCache(path=None).get("a") is None
+
+    expired = ResponseCache(path=str(tmp_path / "expired.sqlite3"), ttl=-1)
+    expired.put("a", "m", "answer", 1.0)
+    assert expired.get("a") is None
+
+
+def test_repeated_question_is_answered_from_cache_at_zero_cost(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"))
+    final = make_message([TextBlock(type="text", text="routes: /a /b")], "end_turn")
+    client = FakeClient([final])
+    handler = ChatHandler(client, FakePool(), response_cache=cache)
+
+    first, first_usage = handler.chat([{"role": "user", "content": "List all available routes"}])
+    second, usage = handler.chat([{"role": "user", "content": "List all available routes "}])
+
+    assert first == second == "routes: /a /b"
+    assert len(client.messages.calls) == 1
+    assert usage["cache_hit"] is True and calculate_cost(usage) == 0.0
+    assert usage["input_tokens"] == 0 and "cache_hit" not in first_usage
+    assert cache.stats()["hits"] == 1
+
+
+class FailingToolPool(FakePool):
+    async def call_tool(self, tool_name, arguments):
+        return ToolErrorText("Error: Tool call 'lookup' failed: connection refused")
+
+
+def test_answers_after_failed_tools_are_not_cached(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"))
+    tool_turn = make_message([ToolUseBlock(id="tu0", type="tool_use", name="lookup", input={"q": 1})],
+                             "tool_use")
+    final = make_message([TextBlock(type="text", text="I couldn't reach the docs")], "end_turn")
+    handler = ChatHandler(FakeClient([tool_turn, final]), FailingToolPool(), response_cache=cache)
+
+    _, usage = handler.chat([{"role": "user", "content": "List all available routes"}])
+
+    assert usage["tool_errors"] == 1
+    assert cache.stats()["hits"] == 0
+    assert cache.get(ResponseCache.make_key(
+        [{"role": "user", "content": "List all available routes"}], MODEL_NAME)) is None
@@ -0,0 +1,34 @@
+import pytest
+
+from database import Base, engine
+import search
+import seed
+
+
+@pytest.fixture(scope="module")
+def seeded_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    seed.seed_cards(engine)
+    search.create_search_index(engine)
+    yield engine
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE IF EXISTS cards_fts")
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_query_terms_drop_stopwords_and_punctuation():
+    assert search.query_terms("Which cards are about GRIEF? grief!") == ["grief"]
+
+
+def test_fts_search_is_ranked(seeded_db):
+    hits = search.search_cards(seeded_db, "which cards are about grief?")
+    assert hits and "Three of Swords" in [hit.name for hit in hits]
+    assert [hit.rank for hit in hits] == sorted((hit.rank for hit in hits), reverse=True)
+    assert len(search.search_cards(seeded_db, "love", limit=2)) == 2
+    assert search.search_cards(seeded_db, "the cards") == []
+
+
+def test_rebuild_is_repeatable(seeded_db):
+    search.create_search_index(seeded_db)
+    assert search.search_cards(seeded_db, "beginnings")[0].name in ("The Fool", "Ace of Wands")
@@ -0,0 +1,68 @@
+import json
+import pytest
+from sqlalchemy import func, select
+
+from database import Base, engine
+from models import ArcanaType, Card
+import seed
+
+
+@pytest.fixture
+def empty_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_seed_is_idempotent(empty_db):
+    assert seed.seed_cards(empty_db) == 78
+    assert seed.seed_cards(empty_db) == 0  # nothing changed, nothing written
+
+    with empty_db.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(Card)).scalar() == 78
+        fool = connection.execute(select(Card.__table__).where(Card.name == "The Fool")).one()
+    assert fool.arcana == ArcanaType.MAJOR and fool.suit is None
+    assert "leap of faith" in fool.keywords
+
+
+def test_changed_cards_are_updated(empty_db, tmp_path):
+    seed.seed_cards(empty_db)
+    data = json.load(open(seed.CARDS_PATH))
+    data["cards"][0]["meaning_upright"] = "Changed"
+    path = tmp_path / "cards.json"
+    path.write_text(json.dumps(data))
+
+    assert seed.seed_cards(empty_db, str(path)) == 1
+    with empty_db.connect() as connection:
+        assert connection.execute(
+            select(Card.meaning_upright).where(Card.name == "The Fool")).scalar() == "Changed"
+
+
+def test_invalid_enums_are_rejected_before_writing(empty_db, tmp_path):
+    data = json.load(open(seed.CARDS_PATH))
+    data["cards"][0]["element"] = "aether"
+    data["cards"][30]["suit"] = None
+    path = tmp_path / "cards.json"
+    path.write_text(json.dumps(data))
+
+    with pytest.raises(ValueError) as error:
+        seed.seed_cards(empty_db, str(path))
+    assert "invalid element 'aether'" in str(error.value)
+    assert "minor arcana cards need a suit" in str(error.value)
+    with empty_db.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(Card)).scalar() == 0
+
+
+def test_renamed_card_updates_its_row(empty_db, tmp_path):
+    seed.seed_cards(empty_db)
+    data = json.load(open(seed.CARDS_PATH))
+    data["cards"][0]["name"] = "The Wanderer"
+    path = tmp_path / "cards.json"
+    path.write_text(json.dumps(data))
+
+    assert seed.seed_cards(empty_db, str(path)) == 1
+    with empty_db.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(Card)).scalar() == 78
+        assert connection.execute(
+            select(Card.name).where(Card.id == data["cards"][0]["id"])).scalar() == "The Wanderer"
@@ -0,0 +1,146 @@
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+
+from src.session_store import (
+    InMemorySessionBackend, SessionStore, SQLSessionBackend, _rebase_usage, new_usage
+)
+
+
+class CountingBackend(InMemorySessionBackend):
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def write(self, records):
+        self.writes.append(len(records))
+        super().write(records)
+
+
+def _turn(session, question, answer, cost):
+    session.messages.append({"role": "user", "content": question})
+    session.messages.append({"role": "assistant", "content": answer})
+    session.total_usage["total_cost"] += cost
+    session.total_usage["request_count"] += 1
+    session.commit()
+
+
+def test_turns_are_batched_and_reloaded():
+    backend = CountingBackend()
+    store = SessionStore(backend, flush_batch=3, flush_interval=60)
+    session = store.open()
+    _turn(session, "q1", "a1", 0.01)
+    _turn(session, "q2", "a2", 0.02)
+    assert backend.writes == [] and store.stats()["pending"] == 2
+    _turn(session, "q3", "a3", 0.03)
+    assert backend.writes == [3]  # one write for the whole batch
+    session.commit()  # nothing changed
+    assert store.stats()["pending"] == 0
+
+    other = SessionStore(backend)  # a second replica
+    reloaded = other.open(session.session_id)
+    assert not reloaded.loaded  # history is read on first use
+    assert reloaded.total_usage["request_count"] == 3
+    assert [m["content"] for m in reloaded.messages] == ["q1", "a1", "q2", "a2", "q3", "a3"]
+
+
+def test_reconnect_catches_up_and_usage_reset():
+    backend = InMemorySessionBackend()
+    first, second = SessionStore(backend, flush_interval=0), SessionStore(backend, flush_interval=0)
+    session = first.open()
+    _turn(session, "q1", "a1", 0.01)
+    assert session.messages  # loaded here
+    _turn(second.open(session.session_id), "q2", "a2", 0.02)
+
+    assert first.open(session.session_id) is session and len(session.messages) == 2
+    first.open(session.session_id, refresh=True)
+    assert len(session.messages) == 4 and session.total_usage["request_count"] == 2
+
+    session.reset_usage()
+    assert SessionStore(backend).open(session.session_id).total_usage == new_usage()
+
+
+def test_memory_is_capped_and_bad_ids_get_new_sessions():
+    store = SessionStore(max_sessions=2, flush_interval=0)
+    ids = [store.open().session_id for _ in range(3)]
+    assert store.stats()["sessions_in_memory"] == 2
+    assert store.open("../etc/passwd").session_id not in ids
+    assert store.open(ids[0]).session_id == ids[0]  # reloaded after eviction
+
+
+def test_failed_flush_is_retried():
+    backend = CountingBackend()
+    store = SessionStore(backend, flush_interval=0)
+    real_write, backend.write = backend.write, None
+    session = store.open()
+    _turn(session, "q", "a", 0.0)  # write raises TypeError and the record stays queued
+    assert store.stats()["pending"] == 1
+    backend.write = real_write
+    store.flush()
+    assert store.stats()["pending"] == 0 and backend.writes == [1]
+
+
+def test_sql_backend_stores_content_blocks(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sessions.db'}")
+    store = SessionStore(SQLSessionBackend(engine), flush_interval=0)
+    session = store.open()
+    block = SimpleNamespace(model_dump=lambda exclude_none: {"type": "text", "text": "hi"})
+    session.messages.append({"role": "user", "content": "q"})
+    session.messages.append({"role": "assistant", "content": [block]})
+    session.total_usage["by_model"]["m"] = {"calls": 1}
+    session.commit()
+
+    reloaded = SessionStore(SQLSessionBackend(engine)).open(session.session_id)
+    assert reloaded.messages[1]["content"] == [{"type": "text", "text": "hi"}]
+    assert reloaded.total_usage["by_model"] == {"m": {"calls": 1}}
+    assert reloaded.next_seq == 1
+
+
+def test_concurrent_replicas_renumber_instead_of_blocking(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sessions.db'}")
+    first = SessionStore(SQLSessionBackend(engine), flush_batch=10, flush_interval=60)
+    second = SessionStore(SQLSessionBackend(engine), flush_interval=0)
+    shared = first.open()
+    _turn(shared, "q1", "a1", 0.01)
+    first.flush()
+    _turn(second.open(shared.session_id), "q2 elsewhere", "a2", 0.02)
+
+    _turn(shared, "q2 here", "a2", 0.02)  # same seq as the other replica's turn
+    bystander = first.open()
+    _turn(bystander, "other user", "ok", 0.01)
+    first.flush()
+
+    assert first.stats()["pending"] == 0 and first.stats()["conflicts"] == 1
+    assert [m["content"] for m in SessionStore(SQLSessionBackend(engine)).open(
+        bystander.session_id).messages] == ["other user", "ok"]
+    merged = first.open(shared.session_id).messages
+    assert [m["content"] for m in merged] == ["q1", "a1", "q2 elsewhere", "a2", "q2 here", "a2"]
+    _turn(shared, "q3", "a3", 0.0)  # the stale object keeps numbering after the merge
+    first.flush()
+    assert first.stats()["conflicts"] == 1
+    # Both replicas' turns are paid for: 0.01 + 0.02 elsewhere + 0.02 here
+    totals = SessionStore(SQLSessionBackend(engine)).open(shared.session_id).total_usage
+    assert round(totals["total_cost"], 6) == 0.05 and totals["request_count"] == 4
+
+
+def test_rebased_usage_adds_per_model_totals():
+    ours = {"total_cost": 0.03, "by_model": {"haiku": {"input_tokens": 30}}}
+    base = {"total_cost": 0.01, "by_model": {"haiku": {"input_tokens": 10}}}
+    theirs = {"total_cost": 0.02, "by_model": {"sonnet": {"input_tokens": 5}}}
+    rebased = _rebase_usage(ours, base, theirs)
+    assert round(rebased["total_cost"], 6) == 0.04
+    assert rebased["by_model"] == {"haiku": {"input_tokens": 20}, "sonnet": {"input_tokens": 5}}
+
+
+def test_failing_writes_are_bounded():
+    backend = CountingBackend()
+    store = SessionStore(backend, flush_interval=60, max_attempts=2, max_pending=3)
+    sessions = [store.open() for _ in range(5)]
+    assert all(session.messages == [] for session in sessions)  # loaded: no reads later
+    backend.write = None
+    for session in sessions:
+        _turn(session, "q", "a", 0.0)
+    assert store.stats()["pending"] == 3 and store.stats()["dropped"] == 2
+    store.flush()
+    store.flush()
+    assert store.stats()["pending"] == 0 and store.stats()["dropped"] == 5
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from mcp.types import CallToolResult, TextContent
+from src.errors import is_tool_error
+from src.mcp_client import MCPClient
+from src.tool_cache import ToolResultCache
+
+
+def test_key_ignores_argument_order():
+    cache = ToolResultCache(tool_ttls={}, path=None)
+    cache.put("route", {"a": 1, "b": 2}, "value")
+    assert cache.get("route", {"b": 2, "a": 1}) == "value"
+    assert cache.stats()["hits"] == 1
+
+
+def test_lru_bound_and_per_tool_ttl():
+    cache = ToolResultCache(max_entries=2, tool_ttls={"live": 0}, path=None)
+    for i in range(3):
+        cache.put("doc", {"i": i}, i)
+    cache.put("live", {}, "now")
+    assert cache.get("doc", {"i": 0}) is None
+    assert cache.get("doc", {"i": 2}) == 2
+    assert cache.get("live", {}) is None
+
+
+def test_expired_entries_miss(monkeypatch):
+    cache = ToolResultCache(default_ttl=10, tool_ttls={}, path=None)
+    cache.put("doc", {}, "old")
+    monkeypatch.setattr("src.tool_cache.time.time", lambda: 10**12)
+    assert cache.get("doc", {}) is None
+
+
+def test_disk_store_survives_restart(tmp_path):
+    path = str(tmp_path / "tools.db")
+    ToolResultCache(tool_ttls={}, path=path).put("doc", {"q": "x"}, "persisted")
+    reopened = ToolResultCache(tool_ttls={}, path=path)
+    assert reopened.get("doc", {"q": "x"}) == "persisted"
+    assert reopened.stats()["disk_hits"] == 1
+
+
+class FakeSession:
+    def __init__(self, is_error=False, delay=0):
+        self.calls = 0
+        self.is_error = is_error
+        self.delay = delay
+
+    async def call_tool(self, tool_name, arguments):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return CallToolResult(content=[TextContent(type="text", text=f"result {self.calls}")],
+                              isError=self.is_error)
+
+
+@pytest.mark.asyncio
+async def test_client_serves_repeat_calls_from_cache():
+    client = MCPClient(cache=ToolResultCache(tool_ttls={}, path=None))
+    session = FakeSession()
+    expected = [{"type": "text", "text": "result 1"}]
+    assert await client.call_tool(session, "doc", {"q": 1}) == expected
+    assert await client.call_tool(session, "doc", {"q": 1}) == expected
+    assert session.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_client_never_caches_errors():
+    client = MCPClient(cache=ToolResultCache(tool_ttls={}, path=None))
+    session = FakeSession(is_error=True)
+    await client.call_tool(session, "doc", {})
+    await client.call_tool(session, "doc", {})
+    assert session.calls == 2
+    assert client.cache.stats()["entries"] == 0
+    assert is_tool_error(await client.call_tool(session, "doc", {}))
+    assert is_tool_error(client.tool_error("doc", RuntimeError("down")))
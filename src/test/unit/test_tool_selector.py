@@ -0,0 +1,41 @@
+from src.text_index import tokenize
+from src.tool_selector import ToolIndex
+
+
+def tool(name, description, **properties):
+    return {"name": name, "description": description,
+            "input_schema": {"type": "object", "properties": {
+                key: {"type": "string", "description": text} for key, text in properties.items()}}}
+
+
+TOOLS = [
+    tool("search_docs", "Full text search over the Vapi documentation", query="search terms"),
+    tool("get_assistant", "Fetch an assistant configuration by id", assistantId="assistant id"),
+    tool("list_phone_numbers", "List phone numbers attached to the account"),
+    tool("create_call", "Start an outbound phone call", phoneNumberId="number to call from"),
+    tool("get_webhook_events", "Describe webhook event payloads", eventType="event name"),
+]
+
+
+def test_tokenize_splits_identifiers_and_drops_stopwords():
+    assert tokenize("getAssistant for the phone_numbers") == ["assistant", "phone", "number"]
+
+
+def test_selects_relevant_tools_in_original_order():
+    selected, report = ToolIndex(TOOLS).select("how do I start an outbound phone call?", top_k=2)
+    assert [t["name"] for t in selected] == ["list_phone_numbers", "create_call"]
+    assert report["fallback"] is None
+    assert report["tools_sent"] == 2 and report["schema_tokens_saved"] > 0
+
+
+def test_low_confidence_and_small_lists_send_everything():
+    index = ToolIndex(TOOLS)
+    selected, report = index.select("tell me a joke", top_k=2)
+    assert selected is TOOLS and report["fallback"] == "low_confidence"
+    assert report["schema_tokens_saved"] == 0
+    assert index.select("phone call", top_k=10)[1]["fallback"] == "small"
+
+
+def test_tools_already_used_are_always_kept():
+    selected, _ = ToolIndex(TOOLS).select("webhook event payload", top_k=1, required={"search_docs"})
+    assert [t["name"] for t in selected] == ["search_docs", "get_webhook_events"]
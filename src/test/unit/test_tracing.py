@@ -0,0 +1,48 @@
+import json
+from src.tracing import TraceRecorder, TurnTrace, percentile, span
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0.0
+
+
+def test_module_span_records_only_into_active_trace():
+    trace = TurnTrace()
+    with span("outside"):
+        pass
+    with trace.activate():
+        with span("mcp.call_tool", tool="lookup") as record:
+            record["cached"] = True
+    assert [s["name"] for s in trace.spans] == ["mcp.call_tool"]
+    assert trace.to_record()["tools"] == ["lookup"]
+
+
+def test_recorder_writes_jsonl_and_summarizes(tmp_path):
+    path = tmp_path / "turns.jsonl"
+    recorder = TraceRecorder(path=str(path))
+    for _ in range(3):
+        trace = TurnTrace()
+        with trace.span("claude.call"):
+            pass
+        trace.attrs["input_tokens"] = 10
+        recorder.record(trace)
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 3
+    assert json.loads(lines[0])["input_tokens"] == 10
+    summary = recorder.summary()
+    assert summary["turn"]["count"] == 3
+    assert set(summary["claude.call"]) == {"count", "p50", "p95", "p99"}
+
+
+def test_recorder_finds_a_turn_by_id():
+    recorder = TraceRecorder(path=None)
+    mine, other = TurnTrace(), TurnTrace()
+    recorder.record(mine)
+    recorder.record(other)
+    assert recorder.find(mine.turn_id)["turn_id"] == mine.turn_id
+    assert recorder.find(None) is None
@@ -0,0 +1,63 @@
+"""Small in-memory BM25 index shared by tool selection and local card search"""
+import math
+import re
+from collections import Counter
+from typing import List, Iterable
+
+STOPWORDS = {
+    "a", "about", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from", "get",
+    "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "the", "this", "to",
+    "what", "which", "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; splits snake_case and camelCase, drops stopwords"""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over pre-tokenized documents"""
+
+    def __init__(self, documents: Iterable[List[str]], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._docs = [Counter(terms) for terms in documents]
+        self._lengths = [sum(doc.values()) for doc in self._docs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._docs else 0.0
+        document_frequency = Counter(term for doc in self._docs for term in doc)
+        count = len(self._docs)
+        self._idf = {term: math.log(1 + (count - df + 0.5) / (df + 0.5))
+                     for term, df in document_frequency.items()}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def scores(self, query: str) -> List[float]:
+        """Score of every document for ``query``, in document order"""
+        terms = [term for term in set(tokenize(query)) if term in self._idf]
+        results = []
+        for doc, length in zip(self._docs, self._lengths):
+            score = 0.0
+            for term in terms:
+                tf = doc.get(term)
+                if not tf:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * length / (self._avg_length or 1))
+                score += self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+    def top(self, query: str, limit: int) -> List[tuple]:
+        """``(index, score)`` of the best ``limit`` documents with a positive score"""
+        scores = self.scores(query)
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        return [(i, scores[i]) for i in ranked[:limit] if scores[i] > 0]
@@ -0,0 +1,165 @@
+"""TTL/LRU cache for deterministic MCP tool results"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .config import (TOOL_CACHE_MAX_ENTRIES, TOOL_CACHE_TTL, TOOL_CACHE_TOOL_TTLS,
+                     TOOL_CACHE_PATH)
+
+import logging
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class ToolResultCache:
+    """Memoizes tool results keyed on tool name plus canonical JSON arguments.
+
+    Entries expire after a per-tool TTL (a TTL of 0 disables caching for that
+    tool) and the in-memory map is bounded LRU. With ``path`` set, entries are
+    also written to a SQLite file so they survive restarts. Only successful
+    results should be passed to ``put``.
+    """
+
+    def __init__(self, max_entries: int = TOOL_CACHE_MAX_ENTRIES,
+                 default_ttl: float = TOOL_CACHE_TTL,
+                 tool_ttls: Optional[Dict[str, float]] = None,
+                 path: Optional[str] = TOOL_CACHE_PATH,
+                 disk_max_entries: Optional[int] = None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.tool_ttls = dict(TOOL_CACHE_TOOL_TTLS if tool_ttls is None else tool_ttls)
+        self.disk_max_entries = disk_max_entries or max_entries * 10
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._puts_since_prune = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        if path:
+            self._open_db(path)
+
+    @staticmethod
+    def make_key(tool_name: str, arguments: Dict[str, Any]) -> str:
+        canonical = json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(f"{tool_name}\0{canonical}".encode()).hexdigest()
+
+    def ttl_for(self, tool_name: str) -> float:
+        return self.tool_ttls.get(tool_name, self.default_ttl)
+
+    def get(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        """Return the cached result, or None on a miss"""
+        if self.ttl_for(tool_name) <= 0:
+            return None
+        key = self.make_key(tool_name, arguments)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            value = self._disk_get(key, now)
+            if value is not _MISSING:
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+            self.misses += 1
+            return None
+
+    def put(self, tool_name: str, arguments: Dict[str, Any], value: Any):
+        """Store a successful result"""
+        ttl = self.ttl_for(tool_name)
+        if ttl <= 0:
+            return
+        key = self.make_key(tool_name, arguments)
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self._disk_put(key, tool_name, expires_at, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM tool_cache")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _remember(self, key, expires_at, value):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _open_db(self, path):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache ("
+            "key TEXT PRIMARY KEY, tool TEXT NOT NULL, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, stored_at REAL NOT NULL)")
+        self._db.execute("DELETE FROM tool_cache WHERE expires_at <= ?", (time.time(),))
+        self._db.commit()
+
+    def _disk_get(self, key, now):
+        if self._db is None:
+            return _MISSING
+        row = self._db.execute(
+            "SELECT value, expires_at FROM tool_cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] <= now:
+            return _MISSING
+        value = json.loads(row[0])
+        self._remember(key, row[1], value)
+        return value
+
+    def _disk_put(self, key, tool_name, expires_at, value):
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tool_cache VALUES (?, ?, ?, ?, ?)",
+                (key, tool_name, json.dumps(value), expires_at, time.time()))
+            self._puts_since_prune += 1
+            if self._puts_since_prune >= 100:
+                self._prune_disk()
+            self._db.commit()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Could not persist tool result for {tool_name}: {e}")
+
+    def _prune_disk(self):
+        self._puts_since_prune = 0
+        self._db.execute("DELETE FROM tool_cache WHERE expires_at <= ?", (time.time(),))
+        self._db.execute(
+            "DELETE FROM tool_cache WHERE key NOT IN ("
+            "SELECT key FROM tool_cache ORDER BY stored_at DESC LIMIT ?)",
+            (self.disk_max_entries,))
+
+
+_tool_cache: Optional[ToolResultCache] = None
+_tool_cache_lock = threading.Lock()
+
+
+def get_tool_cache() -> ToolResultCache:
+    """Return the process-wide tool result cache shared by all MCP workers"""
+    global _tool_cache
+    with _tool_cache_lock:
+        if _tool_cache is None:
+            _tool_cache = ToolResultCache()
+        return _tool_cache
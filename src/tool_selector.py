@@ -0,0 +1,65 @@
+"""Local relevance index for picking the tools sent with each request"""
+import json
+from typing import List, Dict, Any, Iterable, Set, Tuple
+
+from .config import TOOL_SELECTION_TOP_K, TOOL_SELECTION_MIN_SCORE
+from .history import CHARS_PER_TOKEN
+from .text_index import BM25Index, tokenize
+
+import logging
+logger = logging.getLogger(__name__)
+
+NAME_WEIGHT = 3  # a query word matching the tool name counts like three description hits
+
+
+def schema_tokens(tools: List[Dict[str, Any]]) -> int:
+    """Rough token count of tool definitions as sent to the API"""
+    return len(json.dumps(tools)) // CHARS_PER_TOKEN
+
+
+def _schema_text(schema: Dict[str, Any]) -> Iterable[str]:
+    for name, prop in (schema or {}).get("properties", {}).items():
+        yield name
+        if isinstance(prop, dict):
+            yield prop.get("description", "")
+            yield from _schema_text(prop)
+
+
+class ToolIndex:
+    """BM25 index over tool names, descriptions and input schema fields"""
+
+    def __init__(self, tools: List[Dict[str, Any]]):
+        self.tools = tools
+        self._index = BM25Index(
+            tokenize(tool["name"]) * NAME_WEIGHT +
+            tokenize(tool.get("description") or "") +
+            tokenize(" ".join(_schema_text(tool.get("input_schema", {}))))
+            for tool in tools)
+        self.full_schema_tokens = schema_tokens(tools)
+
+    def scores(self, query: str) -> List[float]:
+        return self._index.scores(query)
+
+    def select(self, query: str, top_k: int = TOOL_SELECTION_TOP_K,
+               min_score: float = TOOL_SELECTION_MIN_SCORE,
+               required: Set[str] = frozenset()) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Return the top-k tools for ``query`` plus a report of what was saved.
+
+        Falls back to the full list when selection is disabled, the list is
+        already small, or no tool scores at least ``min_score``. Tools named
+        in ``required`` (e.g. already used in the conversation) are always kept.
+        """
+        report = {"tools_total": len(self.tools), "schema_tokens_saved": 0}
+        if top_k <= 0 or len(self.tools) <= top_k:
+            return self.tools, {**report, "tools_sent": len(self.tools), "fallback": "small"}
+        best = self._index.top(query, top_k)
+        if not best or best[0][1] < min_score:
+            return self.tools, {**report, "tools_sent": len(self.tools), "fallback": "low_confidence"}
+
+        chosen = {i for i, _ in best}
+        chosen |= {i for i, tool in enumerate(self.tools) if tool["name"] in required}
+        # Keep the original order so the request prefix stays stable for prompt caching
+        selected = [tool for i, tool in enumerate(self.tools) if i in chosen]
+        saved = self.full_schema_tokens - schema_tokens(selected)
+        return selected, {**report, "tools_sent": len(selected), "fallback": None,
+                          "schema_tokens_saved": saved}
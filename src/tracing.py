@@ -0,0 +1,160 @@
+"""Per-turn latency tracing and metrics export"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import math
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+from .config import TRACE_LOG_PATH, TRACE_LOG_MAX_BYTES, TRACE_LOG_BACKUPS, TRACE_HISTORY_SIZE
+
+logger = logging.getLogger(__name__)
+
+_current_trace: contextvars.ContextVar[Optional["TurnTrace"]] = contextvars.ContextVar(
+    "current_trace", default=None)
+
+
+class TurnTrace:
+    """Spans, token counts and tool names collected for one chat turn"""
+
+    def __init__(self):
+        self.turn_id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.now().isoformat()
+        self._start = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.attrs: Dict[str, Any] = {}
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time a block; the yielded dict can be given more attributes"""
+        started = time.perf_counter()
+        record = {"name": name, **attrs, "start_ms": round((started - self._start) * 1000, 2)}
+        try:
+            yield record
+        finally:
+            record["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            self.spans.append(record)
+
+    def elapsed_ms(self, record: Dict[str, Any]) -> float:
+        """Milliseconds since the span ``record`` started"""
+        return round((time.perf_counter() - self._start) * 1000 - record["start_ms"], 2)
+
+    @contextmanager
+    def activate(self):
+        """Make this the trace that module-level ``span()`` calls record into.
+
+        Must not span a ``yield`` of an async generator: each step of a
+        generator driven from another thread runs in a fresh context.
+        """
+        token = _current_trace.set(self)
+        try:
+            yield self
+        finally:
+            _current_trace.reset(token)
+
+    def to_record(self) -> Dict[str, Any]:
+        phases: Dict[str, float] = {}
+        for span in self.spans:
+            phases[span["name"]] = round(phases.get(span["name"], 0.0) + span["duration_ms"], 2)
+        return {
+            "turn_id": self.turn_id,
+            "started_at": self.started_at,
+            "duration_ms": round((time.perf_counter() - self._start) * 1000, 2),
+            "phases": phases,
+            "tools": [span["tool"] for span in self.spans if "tool" in span],
+            **self.attrs,
+            "spans": self.spans,
+        }
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a block into the active turn trace, if any"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield dict(attrs)
+        return
+    with trace.span(name, **attrs) as record:
+        yield record
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class TraceRecorder:
+    """Keeps recent turn records in memory and appends them to a rotating JSONL file"""
+
+    def __init__(self, path: Optional[str] = TRACE_LOG_PATH,
+                 max_bytes: int = TRACE_LOG_MAX_BYTES,
+                 backup_count: int = TRACE_LOG_BACKUPS,
+                 history_size: int = TRACE_HISTORY_SIZE):
+        self.recent: deque = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+        self._file_logger = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._file_logger = logging.getLogger(f"{__name__}.turns.{id(self)}")
+            self._file_logger.propagate = False
+            self._file_logger.setLevel(logging.INFO)
+            self._file_logger.addHandler(handler)
+
+    def record(self, trace: TurnTrace) -> Dict[str, Any]:
+        turn = trace.to_record()
+        with self._lock:
+            self.recent.append(turn)
+        if self._file_logger is not None:
+            self._file_logger.info(json.dumps(turn, default=str))
+        logger.debug(f"Turn {turn['turn_id']} took {turn['duration_ms']:.0f} ms: {turn['phases']}")
+        return turn
+
+    def find(self, turn_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The recent record of turn ``turn_id``, if it is still kept"""
+        with self._lock:
+            return next((turn for turn in reversed(self.recent) if turn["turn_id"] == turn_id), None)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """p50/p95/p99 per phase (summed within each turn) and for whole turns"""
+        with self._lock:
+            turns = list(self.recent)
+        samples: Dict[str, List[float]] = {"turn": [t["duration_ms"] for t in turns]}
+        for turn in turns:
+            for name, duration in turn["phases"].items():
+                samples.setdefault(name, []).append(duration)
+        return {
+            name: {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+            }
+            for name, values in samples.items()
+        }
+
+
+_recorder: Optional[TraceRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_trace_recorder() -> TraceRecorder:
+    """Return the process-wide trace recorder"""
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = TraceRecorder()
+        return _recorder